@@ -1,7 +1,9 @@
 import os
 import yfinance as yf
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import date
+from dates import day_numbers, to_day
 
 
 def get_ticker_list():
@@ -14,12 +16,11 @@ def get_ticker_list():
         return []
 
 
+def today_number():
+    return int(np.datetime64(date.today(), 'D').astype(np.int64))
+
+
 def fetch_today_data(ticker):
-    today_str = main_df["Date"] = (
-        pd.to_datetime(main_df["Date"], errors='coerce')  # safely convert
-        .dt.tz_localize(None)                             # remove timezone
-        .dt.strftime('%Y-%m-%d')                          # format as string
-    )
     print(f"Fetching latest data for {ticker}...")
     try:
         stock = yf.Ticker(ticker)
@@ -28,7 +29,9 @@ def fetch_today_data(ticker):
             hist = hist.copy()
             hist.reset_index(inplace=True)
             hist['Ticker'] = ticker
-            hist = hist[hist['Date'].dt.strftime('%Y-%m-%d') == today_str]
+            # Yahoo stamps bars at the exchange's local midnight: keep that day
+            hist['Date'] = to_day(hist['Date'], local=True)
+            hist = hist[day_numbers(hist['Date']) == today_number()]
             return hist
         else:
             print(f"⚠️ No data found for {ticker}")
@@ -43,16 +46,16 @@ def append_all_tickers_once(tickers, file_path):
         print(f"❌ File does not exist: {file_path}")
         return
 
-    existing_df = pd.read_csv(file_path, parse_dates=["Date"], sep=';')
-    today_str = datetime.today().strftime('%Y-%m-%d')
+    existing_df = pd.read_csv(file_path, sep=';')
+    existing_df['Date'] = to_day(existing_df['Date'], local=True)
+    today = today_number()
 
     # Tickers already in the dataset
     known_tickers = set(existing_df['Ticker'].unique())
 
     # Tickers already present for today
     tickers_today = set(
-        existing_df[existing_df['Date'].dt.strftime(
-            '%Y-%m-%d') == today_str]['Ticker'].unique()
+        existing_df[day_numbers(existing_df['Date']) == today]['Ticker'].unique()
     )
 
     all_new_data = []
@@ -1,41 +1,145 @@
-
+import os
+import shutil
+import zlib
+import numpy as np
 import pandas as pd
+from schema import (align_categories, apply_schema, iter_csv, read_csv as read_typed_csv,
+                    read_parquet)
 
 csv_file = "D:\\ETL\\historical_data.csv"
-chunksize = 100_000
+stock_file = "D:/ETL/all_stock_data_merged.csv"
+output_file = "merged_output.csv"
+
+# "memory" loads both tables whole. "partitioned" hash-partitions both
+# tables by ticker into PARTITION_DIR and joins one partition at a time, so
+# peak memory is one partition. "duckdb" lets DuckDB run the join out of
+# core. Out-of-core modes write the rows grouped by partition instead of in
+# all_stock_data_merged order.
+JOIN_MODE = "partitioned"
+PARTITIONS = 64
+CHUNKSIZE = 1_000_000
+PARTITION_DIR = "D:/ETL/join_partitions"
+DUCKDB_MEMORY_LIMIT = "4GB"
+
+
+# === IN MEMORY ===
+
+
+def join_in_memory():
+    # Typed load (schema.py): categorical Ticker, and Date already converted
+    # to UTC and cut to the day, as the old to_datetime(utc=True) ->
+    # tz_convert(None) -> '%Y-%m-%d' steps did. Prices stay float64 (stored
+    # types): the join is written back to disk.
+    df = read_typed_csv(csv_file, "historical_data", stored=True, sep=",")
+    print(f"DataFrame created. Shape: {df.shape}")
+
+    # Perform the left join with different column names
+    df_1 = read_typed_csv(stock_file, "stock_data_merged", stored=True, sep=",")
+    merged_df = join_frames(df_1, df)
+
+    # Save to CSV
+    merged_df.to_csv(output_file, index=False)
+
+
+def join_frames(df_1, df):
+    align_categories(df_1, 'ticker', df, 'Ticker')
+    merged_df = pd.merge(
+        df_1,
+        df,
+        how='left',
+        left_on=['date', 'ticker'],
+        right_on=['Date', 'Ticker']
+    )
+
+    # Drop the duplicate columns from df
+    merged_df.drop(columns=['Date', 'Ticker'], inplace=True)
+    return merged_df
+
+
+# === HASH PARTITIONED ===
+
+
+def partition_csv(path, name, key, side):
+    # Split a CSV into PARTITIONS parquet folders by crc32(ticker). Returns
+    # the column list so empty partitions can still be joined.
+    columns = None
+    for i, chunk in enumerate(iter_csv(path, name, CHUNKSIZE, stored=True, sep=",")):
+        columns = list(chunk.columns)
+        tickers = chunk[key].astype('category')
+        bucket_of = np.array([zlib.crc32(str(t).encode()) % PARTITIONS
+                              for t in tickers.cat.categories], dtype=np.int32)
+        codes = tickers.cat.codes.to_numpy()
+        buckets = np.where(codes >= 0, bucket_of[np.maximum(codes, 0)], 0)
+        for bucket, part in chunk.groupby(buckets, sort=False):
+            folder = os.path.join(PARTITION_DIR, side, f"{bucket:03d}")
+            os.makedirs(folder, exist_ok=True)
+            part.to_parquet(os.path.join(folder, f"{i:06d}.parquet"), index=False)
+        print(f"📦 {side}: partitioned chunk {i} ({len(chunk)} rows)")
+    return columns
+
+
+def load_partition(side, bucket, name, columns):
+    folder = os.path.join(PARTITION_DIR, side, f"{bucket:03d}")
+    if not os.path.isdir(folder):
+        return apply_schema(pd.DataFrame({col: pd.Series(dtype='object') for col in columns}), name, stored=True)
+    parts = [read_parquet(os.path.join(folder, f), name, stored=True) for f in sorted(os.listdir(folder))]
+    # concat turns differing categories back into objects: re-apply
+    return apply_schema(pd.concat(parts, ignore_index=True), name, stored=True)
+
+
+def join_partitioned():
+    if os.path.exists(PARTITION_DIR):
+        shutil.rmtree(PARTITION_DIR)
+    right_columns = partition_csv(csv_file, "historical_data", 'Ticker', 'yahoo')
+    left_columns = partition_csv(stock_file, "stock_data_merged", 'ticker', 'macrotrends')
 
-chunks = []  # list to hold each chunk
-for chunk in pd.read_csv(csv_file, sep=",", chunksize=chunksize, low_memory=False):
-    chunks.append(chunk)
+    rows = 0
+    for bucket in range(PARTITIONS):
+        df_1 = load_partition('macrotrends', bucket, "stock_data_merged", left_columns)
+        if df_1.empty:
+            continue
+        df = load_partition('yahoo', bucket, "historical_data", right_columns)
+        merged_df = join_frames(df_1, df)
+        merged_df.to_csv(output_file, mode='w' if rows == 0 else 'a',
+                         header=rows == 0, index=False)
+        rows += len(merged_df)
+        print(f"🔗 Partition {bucket}: {len(merged_df)} rows")
+    shutil.rmtree(PARTITION_DIR)
+    print(f"DataFrame joined out of core. Rows: {rows}")
 
-df = pd.concat(chunks, ignore_index=True)
-print(f"DataFrame created. Shape: {df.shape}")
-# Step 1: Convert to datetime with timezone awareness
-df['Date'] = pd.to_datetime(df['Date'], utc=True, errors='coerce')
 
-# Step 2: Remove timezone
-df['Date'] = df['Date'].dt.tz_convert(None)
+# === DUCKDB ===
 
-# Step 3: Format as 'YYYY-MM-DD' string
-df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
 
-# Perform the left join with different column names
-df_1=pd.read_csv("D:/ETL/all_stock_data_merged.csv", sep=",", low_memory=False)
-merged_df = pd.merge(
-    df_1,
-    df,
-    how='left',
-    left_on=['date', 'ticker'],
-    right_on=['Date', 'Ticker']
-)
+def join_duckdb():
+    import duckdb
+    con = duckdb.connect()
+    con.execute(f"SET memory_limit = '{DUCKDB_MEMORY_LIMIT}'")
+    con.execute("SET TimeZone = 'UTC'")
+    # Same UTC-day normalisation as schema.to_day
+    con.execute(f"""
+        COPY (
+            SELECT l.*, r.* EXCLUDE ("Date", "Ticker")
+            FROM read_csv('{stock_file}', header = true, types = {{'date': 'DATE'}}) AS l
+            LEFT JOIN (
+                SELECT * REPLACE (
+                    CAST(timezone('UTC', CAST("Date" AS TIMESTAMPTZ)) AS DATE) AS "Date")
+                FROM read_csv('{csv_file}', header = true, types = {{'Date': 'VARCHAR'}})
+            ) AS r
+            ON l."date" = r."Date" AND l."ticker" = r."Ticker"
+        ) TO '{output_file}' (HEADER, DELIMITER ',')
+    """)
+    con.close()
 
-# Drop the duplicate columns from df
-merged_df.drop(columns=['Date', 'Ticker'], inplace=True)
 
-# Save to CSV
-merged_df.to_csv("merged_output.csv", index=False)
+if JOIN_MODE == "duckdb":
+    join_duckdb()
+elif JOIN_MODE == "partitioned":
+    join_partitioned()
+else:
+    join_in_memory()
 
-print("Merge complete. File saved as merged_output.csv")
+print(f"Merge complete. File saved as {output_file}")
 """
 #---------------------Joining Macrotrends Data---------------------#
 SH_SS=read_csv("D:/ETL/all_stock_data_merged.csv", sep=",", low_memory=False)
@@ -1,9 +1,15 @@
 import os
 import glob
 import json
+import numpy as np
 import pandas as pd
 from bs4 import BeautifulSoup
 import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from html import unescape
+from raw_store import RawStore
 
 # Set paths for each folder
 folders = [
@@ -13,80 +19,247 @@ folders = [
     r"D:\ETL\income-statement"
 ]
 
-records = []
+# Parse files in a process pool; each worker returns columnar partial results
+# that are merged before the pivot. False runs everything in this process.
+PARALLEL = True
+WORKERS = os.cpu_count()
+CHUNKSIZE = 32   # payloads handed to a worker at a time
 
-for folder in folders:
-    for filepath in glob.glob(os.path.join(folder, "*.json")):
+# Path to the scrapers' raw_store.sqlite to read payloads from the archive
+# (raw_store.py is a copy of Selenium_project's) instead of the JSON folders above
+RAW_STORE = None
+
+
+def iter_statement_payloads():
+    # (label, decoded payload) for every archive entry of the statement
+    # categories; the JSON folders are read by iter_file_jobs/parse_job
+    store = RawStore(RAW_STORE)
+    for folder in folders:
+        category = os.path.basename(folder)
+        for ticker, full_data in store.iter_json(category):
+            yield f"{category}/{ticker}", full_data
+    store.close()
+
+
+# === FIELD HTML PARSING ===
+# field_name (a link around the metric name) and popup_icon (a div whose
+# data-tipped-options hold ticker/freq/statement) have a fixed shape, so they
+# are read with precompiled regexes; BeautifulSoup is only used when a snippet
+# does not look like the usual markup. Results are cached per distinct string:
+# the same metric HTML repeats across every ticker.
+
+TAG_RE = re.compile(r"<[^>]*>")
+DIV_RE = re.compile(r"""<div\b((?:[^>"']|"[^"]*"|'[^']*')*)>""", re.IGNORECASE)
+ATTR_RE = re.compile(r"""([^\s=/>]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+OPTIONS_RE = re.compile(
+    r"t: '([^']+)', s: '[^']+', freq: '([^']+)', statement: '([^']+)'")
+
+
+@lru_cache(maxsize=65536)
+def parse_metric_name(html_text):
+    # Text content of the field_name snippet
+    if "<!" not in html_text and "<?" not in html_text:
+        text = TAG_RE.sub("", html_text)
+        if "<" not in text and ">" not in text:
+            return unescape(text).strip()
+    return BeautifulSoup(html_text, 'html.parser').text.strip()
+
+
+def _popup_options_fast(html_text):
+    # data-tipped-options of the first ajax-chart div; None when the markup
+    # is not the usual shape.
+    for tag in DIV_RE.finditer(html_text):
+        attrs = {m.group(1).lower(): m.group(2) if m.group(2) is not None else m.group(3)
+                 for m in ATTR_RE.finditer(tag.group(1))}
+        if "ajax-chart" in attrs.get("class", "").split():
+            return unescape(attrs.get("data-tipped-options", ""))
+    return None
+
+
+@lru_cache(maxsize=65536)
+def parse_popup(html_text):
+    # (ticker, frequency, statement) from the popup_icon snippet, or None
+    if "ajax-chart" not in html_text:
+        return None
+    data_attr = _popup_options_fast(html_text)
+    if data_attr is None:
+        div = BeautifulSoup(html_text, 'html.parser').find('div', class_='ajax-chart')
+        if not div:
+            return None
+        data_attr = div.get('data-tipped-options', '')
+    match = OPTIONS_RE.search(data_attr)
+    return match.groups() if match else None
+
+
+# === COLUMNAR PARTIALS ===
+# A parsed payload is a set of typed arrays instead of one dict per value:
+# int32 codes into the payload's own ticker/date/metric name lists and the
+# float64 values (NaN when the cell is not a number).
+
+
+def new_partial():
+    return {"tickers": {}, "dates": {}, "metrics": {},
+            "t": array("i"), "d": array("i"), "m": array("i"), "v": array("d")}
+
+
+def parse_payload(filepath, full_data):
+    partial = new_partial()
+    if not full_data or not isinstance(full_data, list):
+        print(f"Skipping empty or invalid file: {filepath}")
+        return partial
+
+    tickers, dates, metrics = partial["tickers"], partial["dates"], partial["metrics"]
+    t_col, d_col, m_col, v_col = partial["t"], partial["d"], partial["m"], partial["v"]
+    for item in full_data:
+        # Extract metric name from field_name HTML
+        metric = parse_metric_name(item.get('field_name', ''))
+
+        # Extract ticker, frequency, and statement from popup_icon
+        popup = parse_popup(item.get('popup_icon', ''))
+        if not popup:
+            continue
+
+        ticker, frequency, statement = popup
+
+        # Process each date-value pair
+        for date, value in item.items():
+            if date in ['field_name', 'popup_icon']:
+                continue
+
+            # Convert to float if possible, otherwise NaN
+            try:
+                value = float(value)
+            except:
+                value = np.nan
+
+            t_col.append(tickers.setdefault(ticker, len(tickers)))
+            d_col.append(dates.setdefault(date, len(dates)))
+            m_col.append(metrics.setdefault(metric, len(metrics)))
+            v_col.append(value)
+    return partial
+
+
+def iter_file_jobs():
+    # File mode: workers get the path and do the json.load themselves
+    if RAW_STORE:
+        yield from iter_statement_payloads()
+        return
+    for folder in folders:
+        for filepath in glob.glob(os.path.join(folder, "*.json")):
+            yield filepath, None
+
+
+def parse_job(job):
+    # Runs in a worker process
+    filepath, full_data = job
+    if full_data is None:
         with open(filepath, "r", encoding="utf-8") as f:
             try:
                 full_data = json.load(f)
-                if not full_data or not isinstance(full_data, list):
-                    print(f"Skipping empty or invalid file: {filepath}")
-                    continue
             except json.JSONDecodeError:
                 print(f"Skipping malformed file: {filepath}")
-                continue
+                full_data = None
+    return parse_payload(filepath, full_data)
 
-        for item in full_data:
-            # Extract metric name from field_name HTML
-            soup_name = BeautifulSoup(
-                item.get('field_name', ''), 'html.parser')
-            metric = soup_name.text.strip()
-
-            # Extract ticker, frequency, and statement from popup_icon
-            soup_popup = BeautifulSoup(
-                item.get('popup_icon', ''), 'html.parser')
-            div = soup_popup.find('div', class_='ajax-chart')
-            if not div:
-                continue
 
-            data_attr = div.get('data-tipped-options', '')
-            match = re.search(
-                r"t: '([^']+)', s: '[^']+', freq: '([^']+)', statement: '([^']+)'",
-                data_attr
-            )
-            if not match:
-                continue
+# === WIDE BUILDER ===
+# Partials are remapped onto global ticker/date/metric codes as they arrive.
+# The wide frame is then filled by scattering values straight into a
+# preallocated (rows x metrics) float64 array, with no long DataFrame and no
+# pivot_table.
+
+
+class WideBuilder:
+    def __init__(self):
+        self.tickers = {}
+        self.dates = {}
+        self.metrics = {}
+        self.parts = []
+
+    @staticmethod
+    def _remap(codes, local):
+        # Global code for every local code of a partial
+        return np.fromiter((codes.setdefault(name, len(codes)) for name in local),
+                           dtype=np.int32, count=len(local))
+
+    def add(self, partial):
+        if not len(partial["v"]):
+            return
+        t_map = self._remap(self.tickers, partial["tickers"])
+        d_map = self._remap(self.dates, partial["dates"])
+        m_map = self._remap(self.metrics, partial["metrics"])
+        self.parts.append((
+            t_map[np.frombuffer(partial["t"], dtype=np.int32)],
+            d_map[np.frombuffer(partial["d"], dtype=np.int32)],
+            m_map[np.frombuffer(partial["m"], dtype=np.int32)],
+            np.frombuffer(partial["v"], dtype=np.float64),
+        ))
+
+    def build(self):
+        # Same result as pivot_table(aggfunc='first') over one column per
+        # metric: first non-null value per (ticker, date, metric), rows and
+        # columns without any value dropped, rows ordered by (ticker, date)
+        # and metric columns sorted by name.
+        ticker_names = np.array(list(self.tickers), dtype=object)
+        date_names = np.array(list(self.dates), dtype=object)
+        metric_names = np.array(list(self.metrics), dtype=object)
+        if not self.parts:
+            return pd.DataFrame(columns=['ticker', 'date'])
+
+        t, d, m, v = (np.concatenate(column) for column in zip(*self.parts))
+        self.parts = []
+        keep = ~np.isnan(v)
+        t, d, m, v = t[keep], d[keep], m[keep], v[keep]
+
+        # Rank codes by name so the row/column order is lexicographic
+        t_rank = np.empty(len(ticker_names), dtype=np.int64)
+        t_rank[np.argsort(ticker_names, kind="stable")] = np.arange(len(ticker_names))
+        d_rank = np.empty(len(date_names), dtype=np.int64)
+        d_rank[np.argsort(date_names, kind="stable")] = np.arange(len(date_names))
+        m_order = np.argsort(metric_names, kind="stable")
+        m_rank = np.empty(len(metric_names), dtype=np.int64)
+        m_rank[m_order] = np.arange(len(metric_names))
+
+        row_key = t_rank[t] * len(date_names) + d_rank[d]
+        col = m_rank[m]
+        # First value wins: np.unique returns the first index of every cell
+        _, first = np.unique(row_key * len(metric_names) + col, return_index=True)
+        rows, row_index = np.unique(row_key[first], return_inverse=True)
+
+        # Metrics without a single value get no column, as with pivot_table
+        present, col_index = np.unique(col[first], return_inverse=True)
+        grid = np.full((len(rows), len(present)), np.nan)
+        grid[row_index, col_index] = v[first]
+
+        df_wide = pd.DataFrame(grid, columns=list(metric_names[m_order][present]))
+        df_wide.insert(0, 'ticker', np.sort(ticker_names)[rows // len(date_names)])
+        df_wide.insert(1, 'date', np.sort(date_names)[rows % len(date_names)])
+        return df_wide
+
+
+if __name__ == "__main__":
+    # Partials are added in submission order, so "first" still means first
+    # in folder/file order
+    builder = WideBuilder()
+    jobs = iter_file_jobs()
+    if PARALLEL:
+        with ProcessPoolExecutor(max_workers=WORKERS) as pool:
+            for partial in pool.map(parse_job, jobs, chunksize=CHUNKSIZE):
+                builder.add(partial)
+    else:
+        for partial in map(parse_job, jobs):
+            builder.add(partial)
+
+    # Wide format: each metric becomes a column
+    df_wide = builder.build()
+
+    # Convert date to datetime and sort
+    df_wide['date'] = pd.to_datetime(df_wide['date'], errors='coerce')
+    df_wide = df_wide.sort_values(by=['ticker', 'date'])
+
+    # Show sample output
+    print(df_wide.head())
 
-            ticker, frequency, statement = match.groups()
-
-            # Process each date-value pair
-            for date, value in item.items():
-                if date in ['field_name', 'popup_icon']:
-                    continue
-
-                # Convert to float if possible, otherwise set None (will become NaN)
-                try:
-                    value = float(value)
-                except:
-                    value = None
-
-                records.append({
-                    'ticker': ticker,
-                    'date': date,
-                    'frequency': frequency,
-                    'statement': statement,
-                    metric: value
-                })
-
-# Create DataFrame from all records
-df = pd.DataFrame(records)
-
-# Pivot to wide format: each metric becomes a column
-df_wide = df.pivot_table(
-    index=['ticker', 'date'],
-    values=[col for col in df.columns if col not in [
-        'ticker', 'date', 'frequency', 'statement']],
-    aggfunc='first'
-).reset_index()
-
-# Convert date to datetime and sort
-df_wide['date'] = pd.to_datetime(df_wide['date'], errors='coerce')
-df_wide = df_wide.sort_values(by=['ticker', 'date'])
-
-# Show sample output
-print(df_wide.head())
-
-# Save to CSV
-df_wide.to_csv("final_financial_data.csv", index=False)
-print("✅ Exported to final_financial_data.csv")
+    # Save to CSV
+    df_wide.to_csv("final_financial_data.csv", index=False)
+    print("✅ Exported to final_financial_data.csv")
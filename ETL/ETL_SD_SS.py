@@ -1,20 +1,45 @@
 import os
 import json
+import numpy as np
 import pandas as pd
 from glob import glob
 from tqdm import tqdm
 import shutil
+from schema import apply_schema, arrow_schema
+from dates import day_numbers
+from raw_store import RawStore
 
 # === CONFIGURATION ===
 stock_data_dir = "D:/ETL/stock_data"
 stock_splits_dir = "D:/ETL/stock_splits"
 output_dir = "D:/ETL/output_merged"
 final_output = "D:/ETL/all_stock_data_merged.csv"
+final_parquet = "D:/ETL/all_stock_data_merged.parquet"
+
+# True appends every ticker's merged rows straight to the final CSV and to a
+# Parquet file (one row group per ROW_GROUP_ROWS rows): no per-ticker CSVs
+# and nothing larger than one row group held in memory. False keeps the old
+# per-ticker CSVs in output_dir followed by a concat.
+STREAM_OUTPUT = True
+ROW_GROUP_ROWS = 500_000
+
+# True attaches split values to price rows with one vectorized key lookup per
+# batch of BATCH_TICKERS tickers instead of one pd.merge per ticker.
+# ADJUST_SPLITS adds split-adjusted OHLC columns (price divided by the
+# product of the split ratios after that day).
+BULK_MERGE = True
+BATCH_TICKERS = 250
+ADJUST_SPLITS = False
+
+# Path to the scrapers' raw_store.sqlite to read payloads from the archive
+# (raw_store.py is a copy of Selenium_project's) instead of the JSON folders above
+RAW_STORE = None
 
 # === CLEAN OUTPUT FOLDER ===
-if os.path.exists(output_dir):
-    shutil.rmtree(output_dir)
-os.makedirs(output_dir, exist_ok=True)
+if not STREAM_OUTPUT:
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
 
 # === UTILITIES ===
 
@@ -23,9 +48,20 @@ def extract_ticker(filename):
     return os.path.basename(filename).split("_")[0]
 
 
-def process_stock_data_file(filepath, ticker):
+store = None
+if RAW_STORE:
+    store = RawStore(RAW_STORE)
+
+
+def read_payload(filepath, ticker, category):
+    if store is not None:
+        return store.get_json(ticker, category)
     with open(filepath, 'r') as f:
-        raw_data = json.load(f)
+        return json.load(f)
+
+
+def process_stock_data_file(filepath, ticker):
+    raw_data = read_payload(filepath, ticker, "stock_data")
     df = pd.DataFrame(raw_data)
     df.rename(columns={
         'd': 'date',
@@ -42,8 +78,7 @@ def process_stock_data_file(filepath, ticker):
 
 
 def process_stock_split_file(filepath, ticker):
-    with open(filepath, 'r') as f:
-        raw_data = json.load(f)
+    raw_data = read_payload(filepath, ticker, "stock_splits")
     df = pd.DataFrame(raw_data)
     df.rename(columns={
         'd': 'date',
@@ -53,35 +88,205 @@ def process_stock_split_file(filepath, ticker):
     return df
 
 
+# === STREAMING WRITER ===
+# Every ticker frame is aligned on one fixed column list and typed with the
+# "stock_data_merged" schema (schema.py), so all row groups share one schema
+# (tickers without splits get an empty split column).
+
+MERGED_COLUMNS = ['date', 'Stock Price History Open', 'Stock Price History High',
+                  'Stock Price History Low', 'Stock Price History Close', 'Stock Volume',
+                  '50-day MA', '200-day MA', 'ticker', 'Stock Split Value']
+PRICE_COLUMNS = ['Stock Price History Open', 'Stock Price History High',
+                 'Stock Price History Low', 'Stock Price History Close']
+ADJUSTED_COLUMNS = ['Adj ' + col for col in PRICE_COLUMNS]
+if ADJUST_SPLITS:
+    MERGED_COLUMNS = MERGED_COLUMNS + ADJUSTED_COLUMNS
+
+
+class MergedWriter:
+    def __init__(self, csv_path=None, parquet_path=None, row_group_rows=ROW_GROUP_ROWS):
+        self.csv_path = csv_path
+        self.parquet_path = parquet_path
+        self.row_group_rows = row_group_rows
+        self.buffer = []
+        self.buffered = 0
+        self.rows = 0
+        self.parquet = None
+        for path in (csv_path, parquet_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def write(self, df):
+        self.buffer.append(df.reindex(columns=MERGED_COLUMNS))
+        self.buffered += len(df)
+        if self.buffered >= self.row_group_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        chunk = apply_schema(pd.concat(self.buffer, ignore_index=True), "stock_data_merged", stored=True)
+        self.buffer, self.buffered = [], 0
+        if self.csv_path:
+            chunk.to_csv(self.csv_path, mode='a', header=self.rows == 0, index=False)
+        if self.parquet_path:
+            self._write_parquet(chunk)
+        self.rows += len(chunk)
+
+    def _write_parquet(self, chunk):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = arrow_schema("stock_data_merged", MERGED_COLUMNS)
+        table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+        if self.parquet is None:
+            self.parquet = pq.ParquetWriter(self.parquet_path, schema, compression='snappy')
+        self.parquet.write_table(table)
+
+    def close(self):
+        self.flush()
+        if self.parquet is not None:
+            self.parquet.close()
+
+
+# === VECTORIZED SPLIT JOIN ===
+# Prices and splits are keyed by (ticker code << 32) + day number. All splits
+# are loaded once and sorted by key; a batch of price rows then finds its
+# split value with one searchsorted over that array. Same result as the
+# per-ticker left merge on (date, ticker), except that a duplicated split
+# date attaches its first value instead of duplicating the price row.
+
+DAY_OFFSET = 2 ** 31
+
+
+def composite_keys(codes, days):
+    # dates.day_numbers marks missing dates with MISSING_DAY (-2**31), which
+    # becomes key 0 of the ticker: below every real date
+    return (np.asarray(codes, dtype=np.int64) << 32) + (np.asarray(days, dtype=np.int64) + DAY_OFFSET)
+
+
+class SplitIndex:
+    def __init__(self, split_frames, ticker_codes):
+        frames = [df for df in split_frames if len(df)]
+        if frames:
+            splits = pd.concat(frames, ignore_index=True)
+            keys = composite_keys(splits['ticker'].map(ticker_codes).to_numpy(),
+                                  day_numbers(splits['date']))
+            values = pd.to_numeric(splits['Stock Split Value'], errors='coerce').to_numpy(
+                dtype=np.float64)
+        else:
+            keys, values = np.empty(0, dtype=np.int64), np.empty(0)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.values = values[order]
+        # Prefix sums of log ratios: the product of any run of splits of one
+        # ticker is exp(prefix[end] - prefix[start])
+        ratios = np.where(np.isfinite(self.values) & (self.values > 0), self.values, 1.0)
+        self.log_prefix = np.concatenate(([0.0], np.cumsum(np.log(ratios))))
+
+    def lookup(self, codes, days):
+        # Split value on each (ticker, day), NaN where there was no split
+        keys = composite_keys(codes, days)
+        pos = np.searchsorted(self.keys, keys, side='left')
+        found = pos < len(self.keys)
+        found[found] = self.keys[pos[found]] == keys[found]
+        result = np.full(len(keys), np.nan)
+        result[found] = self.values[pos[found]]
+        return result
+
+    def adjustment(self, codes, days):
+        # Product of the ticker's split ratios strictly after each day
+        keys = composite_keys(codes, days)
+        after = np.searchsorted(self.keys, keys, side='right')
+        ticker_end = np.searchsorted(
+            self.keys, (np.asarray(codes, dtype=np.int64) + 1) << 32, side='left')
+        return np.exp(self.log_prefix[ticker_end] - self.log_prefix[after])
+
+
+def merge_batch(tickers, splits, ticker_codes):
+    frames = []
+    for ticker in tickers:
+        try:
+            frames.append(process_stock_data_file(stock_data_files[ticker], ticker))
+        except Exception as e:
+            print(f"⚠️ Error processing {ticker}: {e}")
+    if not frames:
+        return None
+    prices = pd.concat(frames, ignore_index=True)
+    codes = prices['ticker'].map(ticker_codes).to_numpy()
+    days = day_numbers(prices['date'])
+    prices['Stock Split Value'] = splits.lookup(codes, days)
+    if ADJUST_SPLITS:
+        factor = splits.adjustment(codes, days)
+        for col, adj_col in zip(PRICE_COLUMNS, ADJUSTED_COLUMNS):
+            if col in prices:
+                prices[adj_col] = pd.to_numeric(prices[col], errors='coerce') / factor
+    return prices
+
+
 # === INDEX FILES ===
-stock_data_files = {extract_ticker(f): f for f in glob(
-    os.path.join(stock_data_dir, "*_stock_data.json"))}
-stock_split_files = {extract_ticker(f): f for f in glob(
-    os.path.join(stock_splits_dir, "*_stock_splits.json"))}
+if store is not None:
+    stock_data_files = {t: None for t in store.tickers("stock_data")}
+    stock_split_files = {t: None for t in store.tickers("stock_splits")}
+else:
+    stock_data_files = {extract_ticker(f): f for f in glob(
+        os.path.join(stock_data_dir, "*_stock_data.json"))}
+    stock_split_files = {extract_ticker(f): f for f in glob(
+        os.path.join(stock_splits_dir, "*_stock_splits.json"))}
 
 # === PROCESS EACH TICKER ===
-for ticker in tqdm(stock_data_files.keys(), desc="Processing tickers"):
-    try:
-        stock_fp = stock_data_files[ticker]
-        stock_df = process_stock_data_file(stock_fp, ticker)
-
-        split_fp = stock_split_files.get(ticker)
-        if split_fp:
-            split_df = process_stock_split_file(split_fp, ticker)
-            merged_df = pd.merge(stock_df, split_df, on=[
-                                 "date", "ticker"], how="left")
+writer = MergedWriter(final_output, final_parquet) if STREAM_OUTPUT else None
+
+if BULK_MERGE:
+    ticker_codes = {t: i for i, t in enumerate(
+        sorted(set(stock_data_files) | set(stock_split_files)))}
+    split_frames = []
+    for ticker, split_fp in stock_split_files.items():
+        try:
+            split_frames.append(process_stock_split_file(split_fp, ticker))
+        except Exception as e:
+            print(f"⚠️ Error processing {ticker} splits: {e}")
+    splits = SplitIndex(split_frames, ticker_codes)
+
+    tickers = list(stock_data_files)
+    for start in tqdm(range(0, len(tickers), BATCH_TICKERS), desc="Processing ticker batches"):
+        merged_df = merge_batch(tickers[start:start + BATCH_TICKERS], splits, ticker_codes)
+        if merged_df is None:
+            continue
+        if writer is not None:
+            writer.write(merged_df)
         else:
-            merged_df = stock_df  # no split file available
+            merged_df.to_csv(os.path.join(
+                output_dir, f"batch{start // BATCH_TICKERS:05d}_merged.csv"), index=False)
+else:
+    for ticker in tqdm(stock_data_files.keys(), desc="Processing tickers"):
+        try:
+            stock_fp = stock_data_files[ticker]
+            stock_df = process_stock_data_file(stock_fp, ticker)
+
+            if ticker in stock_split_files:
+                split_fp = stock_split_files[ticker]
+                split_df = process_stock_split_file(split_fp, ticker)
+                merged_df = pd.merge(stock_df, split_df, on=[
+                                     "date", "ticker"], how="left")
+            else:
+                merged_df = stock_df  # no split file available
 
-        merged_df.to_csv(os.path.join(
-            output_dir, f"{ticker}_merged.csv"), index=False)
-    except Exception as e:
-        print(f"⚠️ Error processing {ticker}: {e}")
+            if writer is not None:
+                writer.write(merged_df)
+            else:
+                merged_df.to_csv(os.path.join(
+                    output_dir, f"{ticker}_merged.csv"), index=False)
+        except Exception as e:
+            print(f"⚠️ Error processing {ticker}: {e}")
 
-# === COMBINE ALL INTO ONE FILE ===
-print("🔁 Combining all CSVs into one final file...")
-merged_files = glob(os.path.join(output_dir, "*_merged.csv"))
-final_df = pd.concat((pd.read_csv(f) for f in merged_files), ignore_index=True)
-final_df.to_csv(final_output, index=False)
+if writer is not None:
+    writer.close()
+    print(f"✅ Done! Streamed {writer.rows} rows to: {final_output} and {final_parquet}")
+else:
+    # === COMBINE ALL INTO ONE FILE ===
+    print("🔁 Combining all CSVs into one final file...")
+    merged_files = glob(os.path.join(output_dir, "*_merged.csv"))
+    final_df = pd.concat((pd.read_csv(f) for f in merged_files), ignore_index=True)
+    final_df.to_csv(final_output, index=False)
 
-print(f"✅ Done! Final merged file saved as: {final_output}")
+    print(f"✅ Done! Final merged file saved as: {final_output}")
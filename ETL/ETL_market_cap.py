@@ -1,41 +1,126 @@
 import os
 import json
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+from schema import apply_schema, arrow_schema
+from raw_store import RawStore
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def process_market_cap_files(directory):
-    all_data = []
-
-    for filename in os.listdir(directory):
-        if filename.endswith("_market_cap.json"):
-            ticker = filename.split("_")[0]
-            filepath = os.path.join(directory, filename)
-
-            with open(filepath, 'r') as f:
-                try:
-                    data = json.load(f)
-                except json.JSONDecodeError:
-                    print(f"Skipping {filename}: JSON Decode Error")
-                    continue
-
-            df = pd.DataFrame(data)
-            df['ticker'] = ticker
-            df.rename(columns={'v1': 'Market Cap'}, inplace=True)
-            all_data.append(df)
-
-    if all_data:
-        final_df = pd.concat(all_data, ignore_index=True)
-        return final_df
+
+# Path to the scrapers' raw_store.sqlite to read payloads from the archive
+# (raw_store.py is a copy of Selenium_project's) instead of the JSON folder
+RAW_STORE = None
+
+# Parse the JSON files in a process pool (orjson when installed). Each file
+# comes back as columns; the final frame is filled into preallocated arrays
+# instead of concatenating one DataFrame per ticker.
+PARALLEL = True
+WORKERS = os.cpu_count()
+CHUNKSIZE = 64
+
+OUTPUT_CSV = "all_market_caps.csv"
+OUTPUT_PARQUET = "all_market_caps.parquet"
+COLUMNS = ['date', 'Market Cap', 'ticker']
+
+
+def loads(raw):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def to_columns(data):
+    # chartData rows -> (int64 day numbers, float64 market caps)
+    if not isinstance(data, list):
+        data = []
+    dates = [row.get('date') for row in data]
+    try:
+        days = np.array(dates, dtype='datetime64[D]')
+    except (ValueError, TypeError):
+        days = pd.to_datetime(pd.Series(dates), errors='coerce').to_numpy(dtype='datetime64[D]')
+    values = pd.to_numeric(pd.Series([row.get('v1') for row in data], dtype=object),
+                           errors='coerce').to_numpy(dtype=np.float64)
+    return days, values
+
+
+def parse_file(filepath):
+    # Runs in a worker process
+    filename = os.path.basename(filepath)
+    ticker = filename.split("_")[0]
+    with open(filepath, 'rb') as f:
+        try:
+            data = loads(f.read())
+        except ValueError:
+            print(f"Skipping {filename}: JSON Decode Error")
+            return None
+    return (ticker,) + to_columns(data)
+
+
+def iter_market_cap_payloads(directory):
+    if RAW_STORE:
+        store = RawStore(RAW_STORE)
+        for ticker, data in store.iter_json("market_cap"):
+            yield (ticker,) + to_columns(data)
+        store.close()
+        return
+
+    paths = [os.path.join(directory, filename) for filename in os.listdir(directory)
+             if filename.endswith("_market_cap.json")]
+    if PARALLEL:
+        with ProcessPoolExecutor(max_workers=WORKERS) as pool:
+            yield from pool.map(parse_file, paths, chunksize=CHUNKSIZE)
     else:
-        return pd.DataFrame(columns=['date', 'Market Cap', 'ticker'])
+        yield from map(parse_file, paths)
+
+
+def process_market_cap_files(directory):
+    parts = [part for part in iter_market_cap_payloads(directory) if part is not None]
+    if not parts:
+        return pd.DataFrame(columns=COLUMNS)
+
+    # Total row count first, then one fill of preallocated columns
+    total = sum(len(values) for _, _, values in parts)
+    dates = np.empty(total, dtype='datetime64[D]')
+    caps = np.empty(total, dtype=np.float64)
+    codes = np.empty(total, dtype=np.int32)
+    tickers = sorted({ticker for ticker, _, _ in parts})
+    ticker_codes = {ticker: i for i, ticker in enumerate(tickers)}
+
+    pos = 0
+    for ticker, days, values in parts:
+        end = pos + len(values)
+        dates[pos:end] = days
+        caps[pos:end] = values
+        codes[pos:end] = ticker_codes[ticker]
+        pos = end
+
+    final_df = pd.DataFrame({
+        'date': dates,
+        'Market Cap': caps,
+        'ticker': pd.Categorical.from_codes(codes, categories=tickers),
+    })
+    return apply_schema(final_df, "market_caps", stored=True)
+
+
+def write_parquet(df, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.Table.from_pandas(df, schema=arrow_schema("market_caps", COLUMNS),
+                                 preserve_index=False)
+    pq.write_table(table, path, compression='snappy')
 
 
-# Example usage
-directory = "D:/ETL/market_cap"  # replace with the actual path
-df_market_caps = process_market_cap_files(directory)
+if __name__ == "__main__":
+    # Example usage
+    directory = "D:/ETL/market_cap"  # replace with the actual path
+    df_market_caps = process_market_cap_files(directory)
 
-# Save to CSV
-df_market_caps.to_csv("all_market_caps.csv", index=False)
+    # Save to CSV and Parquet
+    df_market_caps.to_csv(OUTPUT_CSV, index=False)
+    write_parquet(df_market_caps, OUTPUT_PARQUET)
 
-# Display the first few rows
-print(df_market_caps.head())
+    # Display the first few rows
+    print(df_market_caps.head())
@@ -3,16 +3,26 @@
 import traceback
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 import yfinance as yf
-import talib
 from tqdm import tqdm
-from smartmoneyconcepts import smc
+from feature_kernels import group_offsets, scatter, rolling_mode, rolling_volume_poc, rolling_block
+from feature_kernels import candle_names, candle_blocks
+from feature_kernels import SMC_COLUMNS, smc_block
 
 # ----------------- Config -----------------
 INPUT_FILE = 'D:/ETL/stock_with_fundamentals_with_sector.csv'
 TICKER_FILE = 'unique_tickers.txt'
+# Price bin width (fraction of price) for the volume point of control next
+# to POC; None computes only the rolling-mode POC
+POC_VOLUME_BIN = None
+# TA-Lib CDL* functions to compute (None = all of them)
+CANDLE_PATTERNS = None
+# Worker processes for the candlestick and SMC stages; one pool serves the
+# whole run
+WORKERS = max(1, (os.cpu_count() or 1) - 1)
 
 # ----------------- Helper Functions -----------------
 
@@ -40,88 +50,76 @@ def load_base_data():
 # ----------------- Candlestick Patterns -----------------
 
 
-def add_candlestick_patterns(df):
-    pattern_funcs = {name: getattr(talib, name)
-                     for name in dir(talib) if name.startswith('CDL')}
-    results = []
-    for ticker, group in tqdm(df.groupby('Ticker_x'), desc="Adding candlestick patterns"):
-        open_, high_, low_, close_ = group['Open'].values, group[
-            'High'].values, group['Low'].values, group['Close'].values
-        for name, func in pattern_funcs.items():
-            try:
-                group[name] = func(open_, high_, low_, close_)
-            except Exception:
-                group[name] = 0
-        results.append(group)
-    return pd.concat(results, ignore_index=True)
+def add_candlestick_patterns(df, patterns=CANDLE_PATTERNS, pool=None):
+    # Rows come back grouped by ticker like the old per-group concat, with
+    # the patterns filled into preallocated int8/int16 blocks
+    # (feature_kernels.candle_blocks) and attached in one concat
+    order, offsets = group_offsets(df['Ticker_x'].to_numpy())
+    df = df.iloc[order].reset_index(drop=True)
+    open_, high_, low_, close_ = (
+        pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+        for col in ['Open', 'High', 'Low', 'Close'])
+    names = candle_names(patterns)
+    print(f"🕯️ Adding {len(names)} candlestick patterns for {len(offsets) - 1} tickers...")
+    blocks = candle_blocks(open_, high_, low_, close_, offsets, names, pool=pool, workers=WORKERS)
+    return pd.concat([df.drop(columns=names, errors='ignore')] +
+                     [pd.DataFrame(block, columns=cols) for cols, block in blocks], axis=1)
 
 # ----------------- SMC Patterns -----------------
 
 
-def detect_smc_patterns(df, swing_length=5):
-    results = []
-    for ticker, group in df.groupby('Ticker_x'):
-        group = group.sort_values('date_x').reset_index(drop=True)
-        ohlc = group[['Open', 'High', 'Low', 'Close', 'Volume']].rename(
-            columns={'Open': 'open', 'High': 'high',
-                     'Low': 'low', 'Close': 'close', 'Volume': 'volume'}
-        )
-        swing = smc.swing_highs_lows(ohlc, swing_length=swing_length)
-        group['swing'] = swing['HighLow']
-        group['swing_level'] = swing['Level']
-        bos_choch = smc.bos_choch(ohlc, swing, close_break=True)
-        group['BOS'] = bos_choch['BOS']
-        group['CHOCH'] = bos_choch['CHOCH']
-        group['structure_level'] = bos_choch['Level']
-        group['structure_broken_index'] = bos_choch['BrokenIndex']
-        fvg = smc.fvg(ohlc, join_consecutive=False)
-        group['FVG'] = fvg['FVG']
-        group['FVG_Top'] = fvg['Top']
-        group['FVG_Bottom'] = fvg['Bottom']
-        group['FVG_MitigatedIndex'] = fvg['MitigatedIndex']
-        ob = smc.ob(ohlc, swing, close_mitigation=False)
-        group['OrderBlock'] = ob['OB']
-        group['OB_Top'] = ob['Top']
-        group['OB_Bottom'] = ob['Bottom']
-        group['OB_Volume'] = ob['OBVolume']
-        group['OB_Percentage'] = ob['Percentage']
-        liq = smc.liquidity(ohlc, swing, range_percent=0.01)
-        group['Liquidity'] = liq['Liquidity']
-        group['Liquidity_Level'] = liq['Level']
-        group['Liquidity_End'] = liq['End']
-        group['Liquidity_Swept'] = liq['Swept']
-        results.append(group)
-    return pd.concat(results).reset_index(drop=True)
+def detect_smc_patterns(df, swing_length=5, pool=None):
+    # Tickers in order, each sorted by date like the old per-group loop; the
+    # OHLCV and the SMC outputs live in shared memory while the workers run
+    # (feature_kernels.smc_block)
+    df = df[df['Ticker_x'].notna()].sort_values(
+        ['Ticker_x', 'date_x'], kind='mergesort').reset_index(drop=True)
+    _, offsets = group_offsets(df['Ticker_x'].to_numpy())
+    prices = np.column_stack([
+        pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+        for col in ['Open', 'High', 'Low', 'Close', 'Volume']])
+    block = smc_block(prices, offsets, swing_length=swing_length, pool=pool, workers=WORKERS)
+    return pd.concat([df.drop(columns=SMC_COLUMNS, errors='ignore'),
+                      pd.DataFrame(block, columns=SMC_COLUMNS)], axis=1)
 
 # ----------------- POC -----------------
 
 
-def add_poc(df, window=50):
-    df['POC'] = df.groupby('Ticker_x')['Close'].transform(
-        lambda x: x.rolling(window).apply(
-            lambda s: s.mode().iloc[0] if not s.mode().empty else np.nan)
-    )
+def add_poc(df, window=50, volume_bin=None):
+    # Rolling mode of Close per ticker (feature_kernels.rolling_mode); with
+    # volume_bin (e.g. 0.005) also the volume point of control, the price
+    # bin that traded the most volume over the window
+    order, offsets = group_offsets(df['Ticker_x'].to_numpy())
+    close = pd.to_numeric(df['Close'], errors='coerce').to_numpy(dtype=np.float64)
+    df['POC'] = scatter(rolling_mode(close[order], offsets, window), order, len(df))
+    if volume_bin:
+        volume = pd.to_numeric(df['Volume'], errors='coerce').to_numpy(dtype=np.float64)
+        df['Volume_POC'] = scatter(rolling_volume_poc(
+            close[order], volume[order], offsets, window, volume_bin), order, len(df))
     return df
 
 # ----------------- Rolling Features -----------------
 
 
+# Windows over Close, computed together by feature_kernels.rolling_block
+ROLLING_SPECS = [
+    spec for win in [20, 50, 200]
+    for spec in [(f'{win}D_SMA', 'mean', win), (f'{win}D_High', 'max', win), (f'{win}D_Low', 'min', win)]
+] + [
+    ('52W_High', 'max', 252), ('52W_Low', 'min', 252),
+    ('AllTime_High', 'max', None), ('AllTime_Low', 'min', None),
+]
+
+
 def add_rolling_features(df):
-    grouped = df.groupby('Ticker_x')
-    for win in [20, 50, 200]:
-        df[f'{win}D_SMA'] = grouped['Close'].transform(
-            lambda x: x.rolling(win).mean())
-        df[f'{win}D_High'] = grouped['Close'].transform(
-            lambda x: x.rolling(win).max())
-        df[f'{win}D_Low'] = grouped['Close'].transform(
-            lambda x: x.rolling(win).min())
-    df['52W_High'] = grouped['Close'].transform(lambda x: x.rolling(252).max())
-    df['52W_Low'] = grouped['Close'].transform(lambda x: x.rolling(252).min())
-    df['AllTime_High'] = grouped['Close'].transform(
-        lambda x: x.expanding().max())
-    df['AllTime_Low'] = grouped['Close'].transform(
-        lambda x: x.expanding().min())
-    df['Daily Change %'] = grouped['Close'].pct_change() * 100
+    order, offsets = group_offsets(df['Ticker_x'].to_numpy())
+    close = pd.to_numeric(df['Close'], errors='coerce').to_numpy(dtype=np.float64)
+    block = scatter(rolling_block(close[order], offsets, ROLLING_SPECS), order, len(df))
+    names = [name for name, _, _ in ROLLING_SPECS]
+    # Attach all windows as one block instead of one insert per column
+    df = pd.concat([df.drop(columns=names, errors='ignore'),
+                    pd.DataFrame(block, columns=names, index=df.index)], axis=1)
+    df['Daily Change %'] = df.groupby('Ticker_x')['Close'].pct_change() * 100
     df['Change from Open %'] = (df['Close'] - df['Open']) / df['Open'] * 100
     return df
 
@@ -204,10 +202,10 @@ FINAL_OUTPUT = "final_features_output.csv"
 chunksize = 100_000
 
 
-def process_chunk(chunk):
-    chunk = add_candlestick_patterns(chunk)
-    chunk = detect_smc_patterns(chunk)
-    chunk = add_poc(chunk)
+def process_chunk(chunk, pool=None):
+    chunk = add_candlestick_patterns(chunk, pool=pool)
+    chunk = detect_smc_patterns(chunk, pool=pool)
+    chunk = add_poc(chunk, volume_bin=POC_VOLUME_BIN)
     chunk = add_rolling_features(chunk)
     return chunk
 
@@ -225,14 +223,45 @@ FINAL_OUTPUT = "final_features_output.csv"
 chunksize = 100_000
 
 
-def process_chunk(chunk):
-    chunk = add_candlestick_patterns(chunk)
-    chunk = detect_smc_patterns(chunk)
-    chunk = add_poc(chunk)
+def process_chunk(chunk, pool=None):
+    chunk = add_candlestick_patterns(chunk, pool=pool)
+    chunk = detect_smc_patterns(chunk, pool=pool)
+    chunk = add_poc(chunk, volume_bin=POC_VOLUME_BIN)
     chunk = add_rolling_features(chunk)
     return chunk
 
 
+def ticker_chunks(reader, key='Ticker_x'):
+    # Regroup CSV chunks so no ticker is split between two of them: the rows
+    # of each chunk's last ticker are held back and put in front of the next
+    # chunk, so rolling windows, SMC swings and POC always see a ticker's
+    # whole history. Memory stays around chunksize plus the longest ticker.
+    # Needs the input sorted by ticker (Last_joins_MC_Fin.py writes it that
+    # way).
+    carry = None
+    seen = set()
+    warned = False
+    for chunk in reader:
+        if carry is not None and len(carry):
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if not len(chunk):
+            continue
+        codes = pd.factorize(chunk[key])[0]
+        split = np.flatnonzero(codes != codes[-1])
+        cut = split[-1] + 1 if len(split) else 0
+        carry, chunk = chunk.iloc[cut:], chunk.iloc[:cut]
+        if not len(chunk):
+            continue
+        tickers = set(chunk[key].dropna().unique())
+        if not warned and seen & tickers:
+            print(f"⚠️ {INPUT_FILE} is not sorted by {key}: some tickers span several chunks")
+            warned = True
+        seen |= tickers
+        yield chunk.reset_index(drop=True)
+    if carry is not None and len(carry):
+        yield carry.reset_index(drop=True)
+
+
 # Overwrite with the correct input file if needed
 INPUT_FILE = 'D:/ETL/stock_with_fundamentals_with_sector.csv'
 
@@ -258,19 +287,21 @@ if __name__ == "__main__":
             chunksize=chunksize
         )
 
-        for i, chunk in enumerate(tqdm(reader, desc="🔄 Processing new data")):
-            try:
-                processed = process_chunk(chunk)
-                processed.to_parquet(
-                    OUTPUT_PARQUET,
-                    engine='fastparquet',
-                    compression='snappy',
-                    index=False,
-                    append=(i > 0)
-                )
-            except Exception as e:
-                print(f"[Chunk {i}] ❌ Failed:")
-                traceback.print_exc()
+        # One worker pool for every chunk and both parallel stages
+        with ProcessPoolExecutor(max_workers=WORKERS) as pool:
+            for i, chunk in enumerate(tqdm(ticker_chunks(reader), desc="🔄 Processing new data")):
+                try:
+                    processed = process_chunk(chunk, pool)
+                    processed.to_parquet(
+                        OUTPUT_PARQUET,
+                        engine='fastparquet',
+                        compression='snappy',
+                        index=False,
+                        append=(i > 0)
+                    )
+                except Exception as e:
+                    print(f"[Chunk {i}] ❌ Failed:")
+                    traceback.print_exc()
 
         print("✅ Finished chunked processing.")
 
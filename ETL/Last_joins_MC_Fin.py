@@ -1,59 +1,56 @@
 import pandas as pd
+from dates import to_day
+from schema import read_csv
 
 # === Step 1: Load macroeconomic + Yahoo Finance market data ===
 Macro_YF = pd.read_csv("D:/ETL/Macro_YF_1.csv", sep=";",
                        on_bad_lines='warn', low_memory=False)
-Macro_YF['date'] = pd.to_datetime(Macro_YF['date'], dayfirst=True)
+Macro_YF['date'] = to_day(Macro_YF['date'], dayfirst=True)
 
 # === Step 2: Load daily market cap data ===
-Market_cap = pd.read_csv("D:/ETL/all_market_caps.csv",
-                         sep=";", low_memory=False)
-Market_cap['date'] = pd.to_datetime(Market_cap['date'], dayfirst=True)
+Market_cap = read_csv("D:/ETL/all_market_caps.csv", "market_caps",
+                      dayfirst=True, sep=";")
 
 # === Step 3: Merge daily macro and market cap data ===
 merged_df = pd.merge(Macro_YF, Market_cap, how='left', on=['date', 'ticker'])
-merged_df['Date'] = pd.to_datetime(merged_df['date'], dayfirst=True)
+merged_df['Date'] = merged_df['date']
 merged_df.rename(columns={'ticker': 'Ticker'}, inplace=True)
 merged_df['Ticker'] = merged_df['Ticker'].astype(str).str.upper().str.strip()
 
 # === Step 4: Load quarterly financial statement data ===
 financial_data = pd.read_csv(
     "D:/ETL/final_financial_data.csv", sep=";", low_memory=False)
-financial_data['date'] = pd.to_datetime(financial_data['date'], dayfirst=True)
+financial_data['date'] = to_day(financial_data['date'], dayfirst=True)
 financial_data.rename(columns={'ticker': 'Ticker'}, inplace=True)
 financial_data['Ticker'] = financial_data['Ticker'].astype(
     str).str.upper().str.strip()
 
 # === Step 5: Merge-asof by Ticker ===
-results = []
+# One merge_asof over all common tickers (left_by/right_by) instead of
+# filtering, sorting and merging ticker by ticker. Naming the two ticker keys
+# Ticker_x / Ticker_y keeps the per-ticker merge's column layout (Ticker_y
+# empty where no statement matched) and Ticker is added back at the end.
 common_tickers = set(merged_df['Ticker']).intersection(
     set(financial_data['Ticker']))
 print(f"🔁 Running merge_asof for {len(common_tickers)} common tickers...")
 
-for ticker in sorted(common_tickers):
-    left = merged_df[merged_df['Ticker'] == ticker].copy()
-    right = financial_data[financial_data['Ticker'] == ticker].copy()
-
-    left.sort_values(by='Date', inplace=True)
-    right.sort_values(by='date', inplace=True)
-
-    if left.empty or right.empty:
-        continue
-
-    merged = pd.merge_asof(
-        left,
-        right,
-        left_on='Date',
-        right_on='date',
-        direction='backward'
-    )
-
-    merged['Ticker'] = ticker  # Ensure Ticker column is preserved
-    results.append(merged)
+left = merged_df[merged_df['Ticker'].isin(common_tickers)]
+right = financial_data[financial_data['Ticker'].isin(common_tickers)]
+left = left.rename(columns={'Ticker': 'Ticker_x'}).sort_values(by='Date', kind='mergesort')
+right = right.rename(columns={'Ticker': 'Ticker_y'}).sort_values(by='date', kind='mergesort')
+
+df_merged = pd.merge_asof(
+    left,
+    right,
+    left_on='Date',
+    right_on='date',
+    left_by='Ticker_x',
+    right_by='Ticker_y',
+    direction='backward'
+)
+df_merged['Ticker'] = df_merged['Ticker_x']  # Ensure Ticker column is preserved
 
 # === Step 6: Combine results and clean ===
-df_merged = pd.concat(results, ignore_index=True)
-
 if 'date' in df_merged.columns:
     df_merged.drop(columns=['date'], inplace=True)
 
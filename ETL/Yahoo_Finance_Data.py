@@ -1,6 +1,7 @@
 import os
 import yfinance as yf
 import pandas as pd
+from schema import apply_schema, read_csv as read_typed_csv
 
 # === Step 1: Load Tickers from File ===
 
@@ -55,13 +56,14 @@ def combine_all_csvs(output_dir):
     for file in files:
         file_path = os.path.join(output_dir, file)
         try:
-            df = pd.read_csv(file_path)
+            df = read_typed_csv(file_path, "historical_data", stored=True)
             all_data.append(df)
         except Exception as e:
             print(f"Error reading {file}: {e}")
 
     if all_data:
-        combined_df = pd.concat(all_data, ignore_index=True)
+        # concat turns differing categories back into objects: re-apply
+        combined_df = apply_schema(pd.concat(all_data, ignore_index=True), "historical_data", stored=True)
         final_path = os.path.join(os.path.dirname(
             __file__), 'historical_data.csv')
         combined_df.to_csv(final_path, index=False)
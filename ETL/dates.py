@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+# === DATE NORMALISATION ===
+# The pipeline joins on calendar days. Yahoo writes timestamps such as
+# "2020-01-02 00:00:00-05:00", Macrotrends plain "2020-01-02", and files that
+# went through Excel "02/01/2020". Parsing those with pd.to_datetime(utc=True)
+# and formatting them back with strftime costs more than the joins, so the
+# usual fixed-width shapes are decoded straight from the bytes; anything else
+# falls back to pd.to_datetime.
+#
+# Days are UTC days by default (what to_datetime(utc=True).tz_convert(None)
+# gave before); local=True keeps the date as written, i.e. the exchange day.
+
+MISSING_DAY = np.iinfo(np.int32).min
+_MINUTES_PER_DAY = 24 * 60
+
+
+def _digits(mat, start, width):
+    value = np.zeros(len(mat), dtype=np.int64)
+    for i in range(start, start + width):
+        value = value * 10 + (mat[:, i].astype(np.int64) - 48)
+    return value
+
+
+def _all_digits(mat, positions):
+    cols = mat[:, positions]
+    return bool(((cols >= 48) & (cols <= 57)).all())
+
+
+def _civil_days(year, month, day):
+    # Days since 1970-01-01 of a proleptic Gregorian date (H. Hinnant's
+    # days_from_civil), all integer numpy arithmetic
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    yoe = year - era * 400
+    doy = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+_MONTH_DAYS = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _fast_days(raw, dayfirst, local):
+    # int64 day numbers for an array of fixed-width byte strings, or None
+    # when the strings are not all one of the known shapes.
+    width = raw.dtype.itemsize
+    if width not in (10, 16, 19, 25):
+        return None
+    mat = raw.view(np.uint8).reshape(len(raw), width)
+
+    if (mat[:, 4] == ord('-')).all() and (mat[:, 7] == ord('-')).all() \
+            and _all_digits(mat, [0, 1, 2, 3, 5, 6, 8, 9]):
+        year, month, day = _digits(mat, 0, 4), _digits(mat, 5, 2), _digits(mat, 8, 2)
+    elif dayfirst and width == 10 and (mat[:, 2] == ord('/')).all() \
+            and (mat[:, 5] == ord('/')).all() and _all_digits(mat, [0, 1, 3, 4, 6, 7, 8, 9]):
+        day, month, year = _digits(mat, 0, 2), _digits(mat, 3, 2), _digits(mat, 6, 4)
+    else:
+        return None
+
+    if ((month < 1) | (month > 12)).any():
+        return None
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    if ((day < 1) | (day > _MONTH_DAYS[month] + (leap & (month == 2)))).any():
+        return None
+    days = _civil_days(year, month, day)
+
+    if width == 25 and not local:
+        # "YYYY-MM-DD HH:MM:SS+HH:MM": shift by the offset to the UTC day
+        if not (np.isin(mat[:, 19], list(b"+-")).all()
+                and _all_digits(mat, [11, 12, 14, 15, 20, 21, 23, 24])):
+            return None
+        minutes = _digits(mat, 11, 2) * 60 + _digits(mat, 14, 2)
+        offset = _digits(mat, 20, 2) * 60 + _digits(mat, 23, 2)
+        offset = np.where(mat[:, 19] == ord('-'), -offset, offset)
+        days += np.floor_divide(minutes - offset, _MINUTES_PER_DAY)
+    return days
+
+
+def _slow_days(series, dayfirst, local):
+    if local:
+        # Drop the offset before parsing: the date as written
+        series = series.astype(str).str.slice(0, 19)
+        parsed = pd.to_datetime(series, errors='coerce', dayfirst=dayfirst)
+    else:
+        parsed = pd.to_datetime(series, utc=True, errors='coerce', dayfirst=dayfirst)
+        parsed = parsed.dt.tz_convert(None)
+    days = parsed.dt.normalize().to_numpy(dtype='datetime64[D]').astype(np.int64)
+    return np.where(parsed.isna().to_numpy(), MISSING_DAY, days)
+
+
+def day_numbers(values, dayfirst=False, local=False):
+    # int32 days since 1970-01-01; MISSING_DAY where the value is missing or
+    # unparsable
+    series = pd.Series(values)
+    result = np.full(len(series), MISSING_DAY, dtype=np.int64)
+
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        if getattr(series.dt, 'tz', None) is not None:
+            series = series.dt.tz_localize(None) if local else series.dt.tz_convert(None)
+        valid = series.notna().to_numpy()
+        result[valid] = series[valid].to_numpy(dtype='datetime64[D]').astype(np.int64)
+        return result.astype(np.int32)
+
+    valid = series.notna().to_numpy()
+    if valid.any():
+        text = series[valid]
+        days = None
+        try:
+            raw = text.to_numpy(dtype=str).astype('S')
+            days = _fast_days(raw, dayfirst, local)
+        except (UnicodeEncodeError, ValueError):
+            pass
+        if days is None:
+            days = _slow_days(text, dayfirst, local)
+        result[valid] = days
+    return result.astype(np.int32)
+
+
+def to_day(values, dayfirst=False, local=False):
+    # datetime64 calendar days (midnight, tz-naive), NaT where missing
+    index = values.index if isinstance(values, pd.Series) else None
+    days = day_numbers(values, dayfirst=dayfirst, local=local).astype('datetime64[D]')
+    days[days == np.datetime64(int(MISSING_DAY), 'D')] = np.datetime64('NaT')
+    return pd.Series(days.astype('datetime64[ns]'), index=index)
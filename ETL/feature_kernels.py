@@ -0,0 +1,359 @@
+import heapq
+import numpy as np
+import pandas as pd
+
+# === FEATURE KERNELS ===
+# Array kernels for the feature engineering scripts. They work on one flat
+# array holding every ticker, with the tickers made contiguous by
+# group_offsets(): rows offsets[g]:offsets[g + 1] of the reordered arrays are
+# ticker g, oldest first. No groupby, no per-window Series.
+
+
+def group_offsets(keys):
+    # Stable order that makes every ticker contiguous (tickers sorted, rows
+    # in their original order) and the start offset of each ticker in it.
+    # Rows with a missing ticker are left out, like groupby does.
+    codes, uniques = pd.factorize(pd.Series(keys), sort=True)
+    order = np.argsort(codes, kind='stable')
+    order = order[codes[order] >= 0]
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    return order, offsets
+
+
+def scatter(values, order, n_rows):
+    # Put kernel output (a column or a block of columns) computed in
+    # `order` back in the frame's row order
+    result = np.full((n_rows,) + np.shape(values)[1:], np.nan)
+    result[order] = values
+    return result
+
+
+# === ROLLING MODE / POINT OF CONTROL ===
+# Sliding-window arg-max over weighted integer codes. Every step adds the
+# newest row's weight to its code and takes the oldest row's weight away;
+# a code stays in the window while it still has rows there, whatever its
+# weight (zero-volume bars). The heaviest code comes from a lazy max-heap of
+# (-weight, code) entries where an entry is stale once its weight no longer
+# matches the running total or its code has left the window. Ties go to
+# the smallest code. O(n log w) over the whole array instead of a
+# value_counts per window.
+
+
+def sliding_argmax(codes, weights, offsets, window):
+    # Winning code of every full window, -1 where the window is not full yet
+    # or holds an invalid (negative) code
+    codes = codes.tolist()
+    weights = weights.tolist()
+    result = np.full(len(codes), -1, dtype=np.int64)
+    for g in range(len(offsets) - 1):
+        start, end = int(offsets[g]), int(offsets[g + 1])
+        totals, counts, heap, invalid = {}, {}, [], 0
+        for i in range(start, end):
+            code = codes[i]
+            if code < 0:
+                invalid += 1
+            else:
+                total = totals.get(code, 0) + weights[i]
+                totals[code] = total
+                counts[code] = counts.get(code, 0) + 1
+                heapq.heappush(heap, (-total, code))
+
+            j = i - window
+            if j >= start:
+                code = codes[j]
+                if code < 0:
+                    invalid -= 1
+                else:
+                    count = counts[code] - 1
+                    if count:
+                        total = totals[code] - weights[j]
+                        totals[code] = total
+                        counts[code] = count
+                        heapq.heappush(heap, (-total, code))
+                    else:
+                        # Last row of the code: drop it even if float
+                        # rounding left a non-zero total behind
+                        del totals[code], counts[code]
+
+            if j + 1 < start or invalid:
+                continue
+            while heap and totals.get(heap[0][1]) != -heap[0][0]:
+                heapq.heappop(heap)
+            if heap:
+                result[i] = heap[0][1]
+            # Stale entries pile up on long tickers; rebuild from the totals
+            if len(heap) > 4 * window:
+                heap = [(-total, code) for code, total in totals.items()]
+                heapq.heapify(heap)
+    return result
+
+
+def rolling_mode(values, offsets, window):
+    # Most frequent value of each `window` rows of a ticker (smallest one on
+    # ties), NaN until the window is full or when it holds a NaN. Same
+    # result as rolling(window).apply(lambda s: s.mode().iloc[0]).
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    uniques, inverse = np.unique(values[valid], return_inverse=True)
+    codes = np.full(len(values), -1, dtype=np.int64)
+    codes[valid] = inverse
+    winner = sliding_argmax(codes, np.ones(len(values), dtype=np.int64), offsets, window)
+    result = np.full(len(values), np.nan)
+    result[winner >= 0] = uniques[winner[winner >= 0]]
+    return result
+
+
+def rolling_volume_poc(prices, volumes, offsets, window, bin_pct=0.005):
+    # Volume point of control: prices are cut into log bins bin_pct wide,
+    # each window's volume is summed per bin and the heaviest bin's centre
+    # is returned
+    prices = np.asarray(prices, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+    valid = (prices > 0) & np.isfinite(prices) & np.isfinite(volumes)
+    step = np.log1p(bin_pct)
+    bins = np.zeros(len(prices), dtype=np.int64)
+    bins[valid] = np.floor(np.log(prices[valid]) / step).astype(np.int64)
+    low = bins[valid].min() if valid.any() else 0
+    codes = np.where(valid, bins - low, -1)
+    winner = sliding_argmax(codes, np.where(valid, volumes, 0.0), offsets, window)
+    result = np.full(len(prices), np.nan)
+    hit = winner >= 0
+    result[hit] = np.exp((winner[hit] + low + 0.5) * step)
+    return result
+
+
+# === ROLLING WINDOWS ===
+# Every window of every ticker from one pass per statistic over the flat
+# array. Sums come from one cumulative sum (each ticker centred on its mean
+# first, so the running total stays small); maxima and minima from the
+# van Herk / Gil-Werman scheme: cut the array into blocks of `window` rows,
+# take running maxima forwards and backwards inside each block, and every
+# window is then the max of one backward and one forward value. O(n) like
+# a monotonic deque but without a Python loop. A window is only kept when
+# it lies inside one ticker and holds no NaN, which is what
+# groupby().rolling(window) gives.
+
+_EXTREMES = {"max": (np.maximum, -np.inf), "min": (np.minimum, np.inf)}
+
+
+def _sliding_extreme(values, window, ufunc, fill):
+    n = len(values)
+    filled = np.where(np.isnan(values), fill, values)
+    blocks = np.concatenate((filled, np.full(-n % window, fill))).reshape(-1, window)
+    forward = ufunc.accumulate(blocks, axis=1).ravel()
+    backward = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    result = np.full(n, np.nan)
+    result[window - 1:] = ufunc(backward[:n - window + 1], forward[window - 1:n])
+    return result
+
+
+def _sliding_sum(values, offsets, window):
+    n = len(values)
+    lengths = np.diff(offsets)
+    filled = np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+    centre = np.repeat(np.add.reduceat(filled, offsets[:-1]) / lengths, lengths)
+    running = np.concatenate(([0.0], np.cumsum(filled - centre)))
+    result = np.full(n, np.nan)
+    result[window - 1:] = running[window:] - running[:n - window + 1]
+    return result + window * centre
+
+
+def _expanding(values, groups, stat):
+    # Max/min of everything so far (NaN rows skipped, as expanding() does)
+    series = pd.Series(values).groupby(groups)
+    running = series.cummax() if stat == "max" else series.cummin()
+    return running.groupby(groups).ffill().to_numpy(dtype=np.float64)
+
+
+def rolling_block(values, offsets, specs):
+    # One float64 column per (name, stat, window) spec, stat "mean", "max"
+    # or "min"; window None is the expanding max/min
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    block = np.full((n, len(specs)), np.nan)
+    if n == 0:
+        return block
+    lengths = np.diff(offsets)
+    groups = np.repeat(np.arange(len(lengths)), lengths)
+    position = np.arange(n) - np.repeat(offsets[:-1], lengths)
+    missing = np.concatenate(([0], np.cumsum(np.isnan(values))))
+
+    for k, (name, stat, window) in enumerate(specs):
+        if window is None:
+            block[:, k] = _expanding(values, groups, stat)
+            continue
+        if window > n:
+            continue
+        if stat == "mean":
+            column = _sliding_sum(values, offsets, window) / window
+        else:
+            column = _sliding_extreme(values, window, *_EXTREMES[stat])
+        keep = position >= window - 1
+        rows = np.flatnonzero(keep)
+        keep[rows] = missing[rows + 1] == missing[rows + 1 - window]
+        block[keep, k] = column[keep]
+    return block
+
+
+# === CANDLESTICK PATTERNS ===
+# TA-Lib pattern outputs are -100/0/100, so the whole dataset's patterns fit
+# one preallocated int8 block; the two Hikkake patterns also emit +-200 and
+# get their own small int16 block. Tickers are handed to the worker pool in
+# one batch per worker; each returns its slice.
+
+WIDE_PATTERNS = {"CDLHIKKAKE", "CDLHIKKAKEMOD"}
+
+
+def candle_names(patterns=None):
+    # All TA-Lib CDL* functions, or the selected ones in the given order
+    import talib
+    available = [name for name in dir(talib) if name.startswith('CDL')]
+    if patterns is None:
+        return available
+    return [name for name in patterns if name in set(available)]
+
+
+def candle_rows(job):
+    # Patterns of one batch of tickers (int16); offsets are relative to the
+    # batch
+    import talib
+    names, open_, high, low, close, offsets = job
+    block = np.zeros((len(close), len(names)), dtype=np.int16)
+    funcs = [getattr(talib, name) for name in names]
+    for g in range(len(offsets) - 1):
+        start, end = offsets[g], offsets[g + 1]
+        args = (open_[start:end], high[start:end], low[start:end], close[start:end])
+        for k, func in enumerate(funcs):
+            try:
+                block[start:end, k] = func(*args)
+            except Exception:
+                pass  # pattern left at 0
+    return block
+
+
+def ticker_batches(offsets, parts):
+    # (first ticker, end ticker) runs of whole tickers, about `parts` of them
+    # with ceil(rows / parts) rows each
+    batch_rows = max(1, -(-int(offsets[-1]) // max(1, parts)))
+    batches, first = [], 0
+    for g in range(1, len(offsets)):
+        if offsets[g] - offsets[first] >= batch_rows or g == len(offsets) - 1:
+            batches.append((first, g))
+            first = g
+    return batches
+
+
+def candle_blocks(open_, high, low, close, offsets, names, pool=None, workers=1):
+    # [(names, int8 block), (names, int16 block)] for the ±100 and the
+    # Hikkake patterns; a block with no names is left out. `pool` is an
+    # executor with `workers` processes, shared by the caller across chunks.
+    narrow = [k for k, name in enumerate(names) if name not in WIDE_PATTERNS]
+    wide = [k for k, name in enumerate(names) if name in WIDE_PATTERNS]
+    blocks = [(cols, np.zeros((len(close), len(cols)), dtype=dtype))
+              for cols, dtype in ((narrow, np.int8), (wide, np.int16)) if cols]
+
+    batches = ticker_batches(offsets, workers if pool is not None else 1)
+    jobs = []
+    for first, end in batches:
+        start, stop = offsets[first], offsets[end]
+        jobs.append((names, open_[start:stop], high[start:stop], low[start:stop],
+                     close[start:stop], offsets[first:end + 1] - start))
+    if len(jobs) > 1:
+        parts = pool.map(candle_rows, jobs)
+    else:
+        parts = map(candle_rows, jobs)
+    for (first, end), part in zip(batches, parts):
+        for cols, block in blocks:
+            block[offsets[first]:offsets[end]] = part[:, cols]
+    return [([names[k] for k in cols], block) for cols, block in blocks]
+
+
+# === SMART MONEY CONCEPTS ===
+# smartmoneyconcepts works on one ticker's OHLCV frame at a time. The whole
+# dataset's OHLCV goes into one shared-memory block, and so do the 19 output
+# columns. Workers attach both by name, build each ticker's frame as a view
+# and write their tickers' rows straight into the output, so only the block
+# names and ticker ranges cross process boundaries.
+
+SMC_COLUMNS = [
+    'swing', 'swing_level',
+    'BOS', 'CHOCH', 'structure_level', 'structure_broken_index',
+    'FVG', 'FVG_Top', 'FVG_Bottom', 'FVG_MitigatedIndex',
+    'OrderBlock', 'OB_Top', 'OB_Bottom', 'OB_Volume', 'OB_Percentage',
+    'Liquidity', 'Liquidity_Level', 'Liquidity_End', 'Liquidity_Swept',
+]
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+
+
+def smc_ticker(ohlc, swing_length=5):
+    # The SMC_COLUMNS of one ticker, oldest row first
+    from smartmoneyconcepts import smc
+    swing = smc.swing_highs_lows(ohlc, swing_length=swing_length)
+    bos_choch = smc.bos_choch(ohlc, swing, close_break=True)
+    fvg = smc.fvg(ohlc, join_consecutive=False)
+    ob = smc.ob(ohlc, swing, close_mitigation=False)
+    liq = smc.liquidity(ohlc, swing, range_percent=0.01)
+    return [
+        swing['HighLow'], swing['Level'],
+        bos_choch['BOS'], bos_choch['CHOCH'], bos_choch['Level'], bos_choch['BrokenIndex'],
+        fvg['FVG'], fvg['Top'], fvg['Bottom'], fvg['MitigatedIndex'],
+        ob['OB'], ob['Top'], ob['Bottom'], ob['OBVolume'], ob['Percentage'],
+        liq['Liquidity'], liq['Level'], liq['End'], liq['Swept'],
+    ]
+
+
+def smc_rows(prices, out, offsets, first, end, swing_length):
+    for g in range(first, end):
+        start, stop = offsets[g], offsets[g + 1]
+        ohlc = pd.DataFrame(prices[start:stop], columns=OHLCV)
+        for k, column in enumerate(smc_ticker(ohlc, swing_length)):
+            out[start:stop, k] = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64)
+
+
+def smc_worker(job):
+    from multiprocessing import shared_memory
+    in_name, out_name, n_rows, offsets, first, end, swing_length = job
+    shm_in = shared_memory.SharedMemory(name=in_name)
+    shm_out = shared_memory.SharedMemory(name=out_name)
+    try:
+        prices = np.ndarray((n_rows, len(OHLCV)), dtype=np.float64, buffer=shm_in.buf)
+        out = np.ndarray((n_rows, len(SMC_COLUMNS)), dtype=np.float64, buffer=shm_out.buf)
+        smc_rows(prices, out, offsets, first, end, swing_length)
+        del prices, out
+    finally:
+        shm_in.close()
+        shm_out.close()
+    return end - first
+
+
+def smc_block(prices, offsets, swing_length=5, pool=None, workers=1):
+    # float64 (rows, SMC_COLUMNS) block for a (rows, 5) OHLCV array whose
+    # tickers are contiguous and date-sorted; one batch of tickers per worker
+    # of `pool`
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    n_rows = len(prices)
+    batches = ticker_batches(offsets, workers if pool is not None else 1)
+    if len(batches) <= 1:
+        out = np.full((n_rows, len(SMC_COLUMNS)), np.nan)
+        smc_rows(prices, out, offsets, 0, len(offsets) - 1, swing_length)
+        return out
+
+    from multiprocessing import shared_memory
+    shm_in = shared_memory.SharedMemory(create=True, size=max(1, prices.nbytes))
+    shm_out = shared_memory.SharedMemory(create=True, size=max(1, n_rows * len(SMC_COLUMNS) * 8))
+    try:
+        np.ndarray(prices.shape, dtype=np.float64, buffer=shm_in.buf)[:] = prices
+        shared_out = np.ndarray((n_rows, len(SMC_COLUMNS)), dtype=np.float64, buffer=shm_out.buf)
+        shared_out[:] = np.nan
+        jobs = [(shm_in.name, shm_out.name, n_rows, offsets, first, end, swing_length)
+                for first, end in batches]
+        list(pool.map(smc_worker, jobs))
+        out = shared_out.copy()
+        del shared_out
+    finally:
+        shm_in.close()
+        shm_in.unlink()
+        shm_out.close()
+        shm_out.unlink()
+    return out
@@ -0,0 +1,128 @@
+import pandas as pd
+from dates import to_day
+
+# === DATASET SCHEMAS ===
+# Compact column types for the tables the ETL scripts hand to each other.
+# Loaders read with these types and writers apply them before saving, so no
+# script has to guess dtypes with low_memory=False. Writers, and loads whose
+# rows end up in a written table, pass stored=True: files keep full
+# precision and only in-memory loads are compact.
+#
+# Kinds (in memory / stored):
+#   date      cut to the UTC day by dates.to_day, datetime64
+#   category  pandas categorical (tickers)
+#   float32   prices and ratios; float64 when stored, as float32 would round
+#             high prices for good (612345.67 -> 612345.69)
+#   float64   values that need the full range (market cap)
+#   count     volumes; float64 (NaN where missing), stored as nullable Int64
+#             when every value is whole
+
+SCHEMAS = {
+    # all_stock_data_merged.csv / .parquet, written by ETL_SD_SS.py
+    "stock_data_merged": {
+        "date": "date",
+        "Stock Price History Open": "float32",
+        "Stock Price History High": "float32",
+        "Stock Price History Low": "float32",
+        "Stock Price History Close": "float32",
+        "Stock Volume": "count",
+        "50-day MA": "float32",
+        "200-day MA": "float32",
+        "ticker": "category",
+        "Stock Split Value": "float32",
+        "Adj Stock Price History Open": "float32",
+        "Adj Stock Price History High": "float32",
+        "Adj Stock Price History Low": "float32",
+        "Adj Stock Price History Close": "float32",
+    },
+    # historical_data.csv, written by Yahoo_Finance_Data.py
+    "historical_data": {
+        "Date": "date",
+        "Open": "float32",
+        "High": "float32",
+        "Low": "float32",
+        "Close": "float32",
+        "Volume": "count",
+        "Dividends": "float32",
+        "Stock Splits": "float32",
+        "Ticker": "category",
+    },
+    # all_market_caps.csv, written by ETL_market_cap.py
+    "market_caps": {
+        "date": "date",
+        "Market Cap": "float64",
+        "ticker": "category",
+    },
+}
+
+# Types read_csv can apply while parsing; dates are converted afterwards
+_PARSE_TYPES = {"category": "category", "float32": "float32", "float64": "float64",
+                "count": "float64"}
+# Kinds whose stored type differs from the in-memory one
+_STORED = {"float32": "float64"}
+
+
+def _convert(series, kind, dayfirst=False, stored=False):
+    if kind == "date":
+        return to_day(series, dayfirst=dayfirst)
+    if kind == "category":
+        return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype("category")
+    values = pd.to_numeric(series, errors='coerce')
+    if kind == "count":
+        if stored and (values.dropna() % 1 == 0).all():
+            return values.astype("Int64")
+        return values.astype("float64")
+    return values.astype(_STORED.get(kind, kind) if stored else kind)
+
+
+def apply_schema(df, name, dayfirst=False, stored=False):
+    # Convert the columns of `df` that the schema knows, in place
+    for column, kind in SCHEMAS[name].items():
+        if column in df.columns:
+            df[column] = _convert(df[column], kind, dayfirst, stored)
+    return df
+
+
+def read_csv(path, name, dayfirst=False, stored=False, **kwargs):
+    schema = SCHEMAS[name]
+    dtype = {col: _PARSE_TYPES[_STORED.get(kind, kind) if stored else kind]
+             for col, kind in schema.items() if kind in _PARSE_TYPES}
+    try:
+        df = pd.read_csv(path, dtype=dtype, **kwargs)
+    except ValueError:
+        # A non-numeric cell in a float column: parse loosely, then coerce
+        df = pd.read_csv(path, low_memory=False, **kwargs)
+    return apply_schema(df, name, dayfirst, stored)
+
+
+def iter_csv(path, name, chunksize, stored=False, **kwargs):
+    # Typed chunks of a large CSV
+    for chunk in pd.read_csv(path, chunksize=chunksize, low_memory=False, **kwargs):
+        yield apply_schema(chunk, name, stored=stored)
+
+
+def read_parquet(path, name, stored=False, **kwargs):
+    return apply_schema(pd.read_parquet(path, **kwargs), name, stored=stored)
+
+
+def align_categories(left, left_col, right, right_col):
+    # Join keys must share their categories or pandas merges them as objects
+    categories = left[left_col].cat.categories.union(right[right_col].cat.categories)
+    left[left_col] = left[left_col].cat.set_categories(categories)
+    right[right_col] = right[right_col].cat.set_categories(categories)
+
+
+def arrow_schema(name, columns):
+    # pyarrow schema for `columns` of a dataset as stored; every row group
+    # written with it has identical types (dictionary-encoded tickers, date32
+    # days, float64 prices and volumes)
+    import pyarrow as pa
+    types = {
+        "date": pa.date32(),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+        "float32": pa.float64(),
+        "float64": pa.float64(),
+        "count": pa.float64(),
+    }
+    schema = SCHEMAS[name]
+    return pa.schema([(col, types[schema[col]]) for col in columns])
@@ -1,83 +1,35 @@
 import os
-import time
-import json
-import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
+import sys
 
-# === SETUP OPTIONS ===
-options = uc.ChromeOptions()
-options.add_argument('--no-sandbox')  # Disables the sandbox security feature
-options.add_argument('--disable-blink-features=AutomationControlled')  # Disables automation-related features
-options.add_argument("--window-size=1280,800")  # Sets the window size
-options.add_argument('--headless')  # Runs Chrome in headless mode
+# The shared scraper modules live one level up in Selenium_project
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# === CREATE OUTPUT FOLDERS ===
-output_dirs = {
-    "stock_data": "stock_data",
-    "stock_splits": "stock_splits",
-    "market_cap": "market_cap"
-}
-for folder in output_dirs.values():
-    os.makedirs(folder, exist_ok=True)
-
-# === FUNCTION TO LOAD TICKERS ===
-
-
-def get_ticker_list():
-    path = os.path.join(os.path.dirname(__file__), 'unique_tickers.txt')
-    try:
-        with open(path, 'r') as f:
-            return [line.strip() for line in f if line.strip()]
-    except FileNotFoundError:
-        print("Ticker list file not found!")
-        return []
+from job_ledger import JobLedger
+from readiness import ReadinessLog
+from telemetry import Telemetry
+from scraper_core import EXTRACTORS, get_ticker_list, run_jobs
 
+# === CATEGORIES TO FETCH ===
+CATEGORIES = ["stock_data", "stock_splits", "market_cap"]
 
 # === LOAD TICKERS ===
-tickers = get_ticker_list()
+tickers = get_ticker_list(os.path.join(os.path.dirname(__file__), 'unique_tickers.txt'))
 if not tickers:
     print("No tickers found. Exiting.")
     exit()
 
-# === START SELENIUM DRIVER ===
-driver = uc.Chrome(options=options)
-
-# === URL TYPES TO FETCH ===
-url_map = {
-    "stock_data": "https://www.macrotrends.net/assets/php/stock_price_history.php?t={}",
-    "stock_splits": "https://www.macrotrends.net/assets/php/stock_splits.php?t={}",
-    "market_cap": "https://www.macrotrends.net/assets/php/market_cap.php?t={}"
-}
+ledger = JobLedger()
+ledger.seed(tickers, CATEGORIES, output_path=lambda ticker, category:
+            EXTRACTORS[category].output_path(ticker))
 
 # === LOOP THROUGH TICKERS ===
-for ticker in tickers:
-    print(f"\n➡️ Processing ticker: {ticker}")
-    for category, base_url in url_map.items():
-        try:
-            url = base_url.format(ticker.upper())
-            print(f"🌐 Loading URL for {category}: {url}")
-            driver.get(url)
-            time.sleep(3)  # Wait for JavaScript data to load
-
-            try:
-                data_json = driver.execute_script(
-                    "return JSON.stringify(window.dataDaily);")
-                if data_json:
-                    output_path = os.path.join(
-                        output_dirs[category], f"{ticker}_{category}.json")
-                    with open(output_path, "w", encoding="utf-8") as f:
-                        f.write(data_json)
-                    print(f"💾 Saved {category} data to {output_path}")
-                else:
-                    print(f"⚠️ No {category} data found for {ticker}")
-            except WebDriverException as e:
-                print(f"❌ JS extraction failed for {category} - {ticker}: {e}")
-
-        except Exception as e:
-            print(f"❌ Failed to fetch {category} for {ticker}: {e}")
-
-# === CLOSE BROWSER ===
-driver.quit()
+timings = ReadinessLog()
+telemetry = Telemetry("macrotrends")
+run_jobs(ledger.pending(CATEGORIES), ledger, timings=timings, fetch_mode="browser",
+         telemetry=telemetry)
+
+telemetry.close()
+print(timings.summary())
+print(telemetry.summary())
+print(ledger.summary(CATEGORIES))
+ledger.close()
@@ -0,0 +1,239 @@
+import asyncio
+import os
+import random
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from direct_fetch import HEADERS, extract_js_array, to_json_text
+from job_ledger import JobLedger
+from raw_store import RawStore, save_payload
+from scraper_core import EXTRACTORS, get_ticker_list
+from telemetry import Telemetry
+
+# === CONFIGURATION ===
+CONCURRENCY = 16            # requests in flight at once
+REQUESTS_PER_SECOND = 5.0   # token-bucket refill rate per host
+BURST = 10                  # token-bucket capacity per host
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0          # seconds, doubled on every retry
+BACKOFF_CAP = 60.0
+REQUEST_TIMEOUT = 30
+PROGRESS_EVERY = 10.0       # seconds between progress lines
+
+# "files" writes one JSON file per ticker; "archive" stores compressed,
+# deduplicated payloads in raw_store.sqlite (see raw_store.py)
+STORAGE = "files"
+
+# Any keys of scraper_core.EXTRACTORS
+CATEGORIES = list(EXTRACTORS)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+# === RATE LIMITING ===
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostLimiter:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+
+    async def acquire(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.capacity)
+        await self.buckets[host].acquire()
+
+
+def backoff_delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return min(BACKOFF_CAP, float(retry_after))
+        except ValueError:
+            pass
+    # Full jitter: spreads retries from many workers instead of bunching them
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+# === PROGRESS ===
+
+
+class Progress:
+    def __init__(self, total):
+        self.total = total
+        self.ok = 0
+        self.failed = 0
+        self.start = time.monotonic()
+
+    @property
+    def done(self):
+        return self.ok + self.failed
+
+    def line(self):
+        elapsed = time.monotonic() - self.start
+        rate = self.done / elapsed * 60 if elapsed else 0.0
+        return (f"📊 {self.done}/{self.total} | ✅ {self.ok} | ❌ {self.failed}"
+                f" | {rate:.0f} jobs/min")
+
+    async def report(self):
+        while True:
+            await asyncio.sleep(PROGRESS_EVERY)
+            print(self.line())
+
+
+# === DOWNLOAD ===
+
+
+def _write(store, ticker, category, text, path):
+    if store is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    save_payload(store, ticker, category, text, path)
+
+
+async def fetch_one(session, limiter, ledger, store, ticker, category, telemetry=None):
+    extractor = EXTRACTORS[category]
+    url = extractor.url(ticker)
+    variable = extractor.variable
+    output_path = extractor.output_path(ticker)
+    started = time.monotonic()
+    phases = {}
+    error = None
+
+    def finish(outcome, size=None, retries=0):
+        if telemetry is not None:
+            telemetry.record(ticker, category, outcome, time.monotonic() - started,
+                             size, phases, retries)
+
+    for attempt in range(MAX_RETRIES + 1):
+        await limiter.acquire(url)
+        request_started = time.monotonic()
+        try:
+            async with session.get(url) as response:
+                if response.status in RETRY_STATUSES:
+                    error = f"HTTP {response.status}"
+                    delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+                    print(f"⏳ {response.status} on {ticker}/{category}, retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                if response.status == 404:
+                    print(f"🚫 {ticker}/{category}: page not found")
+                    ledger.mark_empty(ticker, category, "HTTP 404",
+                                      time.monotonic() - started)
+                    finish("empty", retries=attempt)
+                    return False
+                response.raise_for_status()
+                html = await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = repr(e)
+            delay = backoff_delay(attempt)
+            print(f"⚠️ {ticker}/{category}: {e!r}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        phases["navigate"] = time.monotonic() - request_started
+
+        extract_started = time.monotonic()
+        data = extract_js_array(html, variable)
+        phases["extract"] = time.monotonic() - extract_started
+        if data is None:
+            print(f"⚠️ No {variable} found for {ticker}/{category}")
+            ledger.mark_empty(ticker, category, f"no {variable}",
+                              time.monotonic() - started)
+            finish("empty", retries=attempt)
+            return False
+        text = to_json_text(data)
+        await asyncio.to_thread(_write, store, ticker, category, text, output_path)
+        ledger.mark_done(ticker, category, len(text), time.monotonic() - started)
+        finish("done", len(text), attempt)
+        return True
+
+    print(f"❌ {ticker}/{category}: giving up after {MAX_RETRIES} retries")
+    ledger.mark_failed(ticker, category, error, time.monotonic() - started)
+    finish("failed", retries=MAX_RETRIES)
+    return False
+
+
+async def worker(queue, session, limiter, ledger, store, progress, telemetry=None):
+    while True:
+        ticker, category = await queue.get()
+        try:
+            if await fetch_one(session, limiter, ledger, store, ticker, category, telemetry):
+                progress.ok += 1
+            else:
+                progress.failed += 1
+        except Exception as e:
+            print(f"❌ {ticker}/{category}: {e}")
+            ledger.mark_failed(ticker, category, e)
+            progress.failed += 1
+        finally:
+            queue.task_done()
+
+
+async def download(jobs, ledger, store=None, telemetry=None):
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    progress = Progress(queue.qsize())
+    limiter = HostLimiter(REQUESTS_PER_SECOND, BURST)
+
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=CONCURRENCY)
+    async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout,
+                                     connector=connector) as session:
+        tasks = [asyncio.create_task(worker(queue, session, limiter, ledger, store, progress,
+                                            telemetry))
+                 for _ in range(CONCURRENCY)]
+        reporter = asyncio.create_task(progress.report())
+        await queue.join()
+        for task in tasks + [reporter]:
+            task.cancel()
+        await asyncio.gather(*tasks, reporter, return_exceptions=True)
+    print(progress.line())
+
+
+# === MAIN ===
+if __name__ == "__main__":
+    tickers = get_ticker_list()
+    if not tickers:
+        print("No tickers found. Exiting.")
+        exit()
+
+    ledger = JobLedger()
+    ledger.seed(tickers, CATEGORIES, output_path=lambda ticker, category:
+                EXTRACTORS[category].output_path(ticker))
+    jobs = ledger.pending(CATEGORIES)
+
+    print(f"🚀 {len(jobs)} downloads across {len(CATEGORIES)} categories")
+    store = RawStore() if STORAGE == "archive" else None
+    telemetry = Telemetry("async_downloader")
+    asyncio.run(download(jobs, ledger, store, telemetry))
+    telemetry.close()
+    print(telemetry.summary())
+    print(ledger.summary(CATEGORIES))
+    ledger.close()
+    if store is not None:
+        store.close()
+    print("✅ Done.")
@@ -0,0 +1,119 @@
+import queue
+import threading
+import time
+
+# === POLITENESS BUDGET ===
+# One budget is shared by every worker so the total page rate against
+# Macrotrends stays bounded no matter how many browsers are running.
+
+
+class PolitenessBudget:
+    def __init__(self, pages_per_second):
+        self.interval = 1.0 / pages_per_second if pages_per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self):
+        with self._lock:
+            slot = max(time.monotonic(), self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# === BROWSER POOL ===
+# Each worker thread owns one Chrome instance and pulls jobs from a shared
+# queue. Drivers are recycled after `recycle_after` pages (Chrome leaks memory
+# on long sessions) and replaced immediately if a job kills the session.
+
+
+class BrowserPool:
+    def __init__(self, make_driver, handle_job, workers=4, recycle_after=200,
+                 pages_per_second=2.0):
+        self.make_driver = make_driver
+        self.handle_job = handle_job
+        self.workers = max(1, workers)
+        self.recycle_after = recycle_after
+        self.budget = PolitenessBudget(pages_per_second)
+        # undetected_chromedriver patches the driver binary on startup, which
+        # is not safe to do from several threads at once.
+        self._launch_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.done = 0
+        self.failed = 0
+
+    def _launch(self, worker_id):
+        with self._launch_lock:
+            print(f"🧭 Worker {worker_id}: starting Chrome")
+            return self.make_driver()
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _worker(self, worker_id, jobs):
+        driver = None
+        pages = 0
+        while True:
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                break
+
+            if driver is None:
+                try:
+                    driver = self._launch(worker_id)
+                except Exception as e:
+                    print(f"❌ Worker {worker_id}: could not start Chrome: {e}")
+                    with self._stats_lock:
+                        self.failed += 1
+                    jobs.task_done()
+                    continue
+                pages = 0
+
+            self.budget.acquire()
+            try:
+                self.handle_job(driver, job)
+                with self._stats_lock:
+                    self.done += 1
+            except Exception as e:
+                print(f"❌ Worker {worker_id}: {job} failed, recycling driver: {e}")
+                with self._stats_lock:
+                    self.failed += 1
+                self._quit(driver)
+                driver = None
+            finally:
+                jobs.task_done()
+
+            pages += 1
+            if driver is not None and pages >= self.recycle_after:
+                print(f"♻️ Worker {worker_id}: recycling Chrome after {pages} pages")
+                self._quit(driver)
+                driver = None
+
+        if driver is not None:
+            self._quit(driver)
+
+    def run(self, jobs):
+        job_queue = queue.Queue()
+        for job in jobs:
+            job_queue.put(job)
+        total = job_queue.qsize()
+        print(f"🚦 {total} jobs across {self.workers} browser worker(s)")
+
+        start = time.monotonic()
+        threads = [threading.Thread(target=self._worker, args=(i, job_queue), daemon=True)
+                   for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        elapsed = time.monotonic() - start
+        rate = self.done / elapsed * 60 if elapsed else 0.0
+        print(f"🏁 Pool finished: {self.done} ok, {self.failed} failed "
+              f"in {elapsed:.0f}s ({rate:.1f} pages/min)")
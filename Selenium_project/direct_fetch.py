@@ -0,0 +1,110 @@
+import json
+import re
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from telemetry import phase
+
+# === DIRECT HTTP FETCH ===
+# The Macrotrends assets/php endpoints ship their data as a JS array literal
+# in inline script (`var dataDaily = [...]`, `var chartData = [...]`), so the
+# page does not need to be rendered to read it.
+
+HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.macrotrends.net/",
+}
+
+_decoder = json.JSONDecoder()
+
+
+def make_session(pool_size=8, retries=3):
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5,
+                  status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=pool_size,
+                          pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def extract_js_array(html, name):
+    # Decode the array literal assigned to `name`. The first non-empty
+    # assignment wins; pages sometimes initialise the variable to [] first.
+    found = None
+    for match in re.finditer(r"\b" + re.escape(name) + r"\s*=\s*(?=\[)", html):
+        try:
+            data, _ = _decoder.raw_decode(html, match.end())
+        except ValueError:
+            continue
+        if data:
+            return data
+        if found is None:
+            found = data
+    return found
+
+
+# A JSON string (skipped as is) or a number json.dumps wrote as a float
+_FLOAT_TOKEN = re.compile(
+    r'"(?:\\.|[^"\\])*"|-?\d+(?:\.\d+)?[eE][+-]?\d+|-?\d+\.\d+|NaN|-?Infinity')
+
+
+def js_number(text):
+    # Python float text -> what JS Number.prototype.toString gives for the
+    # same double: 1.0 -> 1, 1e-07 -> 1e-7, 1e+16 -> 10000000000000000.
+    # Both print the shortest round-tripping digits, only the layout differs.
+    if text in ("NaN", "Infinity", "-Infinity"):
+        return "null"  # JSON.stringify writes non-finite numbers as null
+    sign = "-" if text.startswith("-") else ""
+    mantissa, _, exponent = text.lstrip("-").lower().partition("e")
+    whole, _, fraction = mantissa.partition(".")
+    digits = (whole + fraction).lstrip("0")
+    point = len(whole) + int(exponent or 0) - (len(whole + fraction) - len(digits))
+    digits = digits.rstrip("0")
+    if not digits:
+        return "0"
+    k, n = len(digits), point
+    if k <= n <= 21:
+        out = digits + "0" * (n - k)
+    elif 0 < n <= 21:
+        out = digits[:n] + "." + digits[n:]
+    elif -6 < n <= 0:
+        out = "0." + "0" * -n + digits
+    else:
+        e = n - 1
+        out = digits[0] + ("." + digits[1:] if k > 1 else "") + ("e+" if e > 0 else "e-") + str(abs(e))
+    return sign + out
+
+
+def to_json_text(data):
+    # Same text JSON.stringify() produces in the browser path, so the
+    # content hash does not depend on the fetch mode: compact separators,
+    # non-ASCII kept, and floats laid out the JS way (1.0 -> 1)
+    text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return _FLOAT_TOKEN.sub(
+        lambda m: m.group(0) if m.group(0).startswith('"') else js_number(m.group(0)), text)
+
+
+def fetch_embedded_json(session, url, name, timeout=15):
+    # Returns the JSON text for `name`, or None so the caller can fall back
+    # to Chrome.
+    try:
+        with phase("navigate"):
+            response = session.get(url, timeout=timeout)
+            response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"⚠️ Direct fetch failed for {url}: {e}")
+        return None
+
+    with phase("extract"):
+        data = extract_js_array(response.text, name)
+    if data is None:
+        print(f"⚠️ No `{name}` array found in {url}")
+        return None
+    return to_json_text(data)
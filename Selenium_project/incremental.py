@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+
+# === INCREMENTAL PRICE HISTORY ===
+# stock_price_history.php always returns the full daily series, oldest first.
+# Instead of rewriting {ticker}_stock_data.json on every run, only the rows
+# after the last stored date are decoded and appended to the file, and a
+# payload whose hash matches the previous fetch is skipped entirely. Before
+# appending, the last OVERLAP stored rows are compared with the payload's
+# rows up to the same date: a split re-adjusts the whole history and the
+# last bar can be revised, and either means the file is rewritten instead.
+
+DATE_KEY = "d"
+OVERLAP = 5
+
+
+def payload_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def tail_after(text, last_date):
+    # Decode only the rows after `last_date`. Returns None when the stored
+    # date is not in the payload so the caller can rewrite the whole file.
+    marker = f'"{DATE_KEY}":"{last_date}"'
+    pos = text.rfind(marker)
+    if pos == -1:
+        return None
+    end = text.find("},", pos)
+    if end == -1:
+        return []  # last stored row is still the last row
+    return json.loads("[" + text[end + 2:].rstrip().rstrip("]") + "]")
+
+
+def rows_until(text, last_date, count=OVERLAP):
+    # The payload's last `count` rows up to and including `last_date`
+    # (rows are flat objects, so braces delimit them)
+    pos = text.rfind(f'"{DATE_KEY}":"{last_date}"')
+    if pos == -1:
+        return None
+    end = text.find("}", pos) + 1
+    start = text.rfind("{", 0, pos)
+    for _ in range(count - 1):
+        previous = text.rfind("{", 0, start)
+        if previous == -1:
+            break
+        start = previous
+    return json.loads("[" + text[start:end] + "]")
+
+
+def stored_tail(path, count=OVERLAP):
+    # Last `count` rows of a stored JSON array file, reading only its end
+    size = os.path.getsize(path)
+    chunk = 4096
+    with open(path, "rb") as f:
+        while True:
+            f.seek(max(0, size - chunk))
+            tail = f.read().decode("utf-8", errors="ignore")
+            starts = [i for i, char in enumerate(tail) if char == "{"]
+            if len(starts) >= count or chunk >= size:
+                break
+            chunk *= 4
+    if not starts:
+        return []
+    body = tail[starts[-min(count, len(starts))]:].rstrip().rstrip("]")
+    return json.loads("[" + body + "]")
+
+
+def append_json_rows(path, rows):
+    # Append rows to a JSON array file in place: overwrite the closing ']'
+    # instead of loading and re-serialising the whole history.
+    if not rows:
+        return
+    body = ",".join(json.dumps(row, ensure_ascii=False, separators=(",", ":"))
+                    for row in rows)
+    with open(path, "r+b") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        # Walk back over trailing whitespace to the closing bracket
+        while pos > 0:
+            f.seek(pos - 1)
+            char = f.read(1)
+            if char == b"]":
+                break
+            if not char.isspace():
+                raise ValueError(f"{path} is not a JSON array")
+            pos -= 1
+        else:
+            raise ValueError(f"{path} is not a JSON array")
+        f.seek(pos - 2 if pos >= 2 else 0)
+        is_empty = f.read(1) == b"["
+        f.seek(pos - 1)
+        f.write(((b"" if is_empty else b",") + body.encode("utf-8") + b"]"))
+        f.truncate()
+
+
+def last_row_key(text):
+    pos = text.rfind(f'"{DATE_KEY}":"')
+    if pos == -1:
+        return None
+    start = pos + len(DATE_KEY) + 4
+    return text[start:text.index('"', start)]
+
+
+def merge_price_history(path, text, stored_hash, last_date):
+    # Returns (status, content_hash, last_key, new_rows) with status one of
+    # "unchanged", "appended" or "rewritten".
+    content_hash = payload_hash(text)
+    if content_hash == stored_hash and os.path.exists(path):
+        return "unchanged", content_hash, last_date, 0
+
+    rows = None
+    if last_date and os.path.exists(path):
+        overlap = rows_until(text, last_date)
+        try:
+            unchanged = overlap is not None and stored_tail(path, len(overlap)) == overlap
+        except ValueError:
+            unchanged = False
+        if unchanged:
+            rows = tail_after(text, last_date)
+
+    if rows is None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return "rewritten", content_hash, last_row_key(text), None
+
+    append_json_rows(path, rows)
+    new_last = rows[-1][DATE_KEY] if rows else last_date
+    return "appended", content_hash, new_last, len(rows)
@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import threading
+import time
+
+# === JOB LEDGER ===
+# One row per (ticker, category) recording what happened the last time it was
+# fetched. Scrapers ask the ledger for outstanding work instead of slicing the
+# ticker list by hand or checking every output file on disk.
+#
+# status: pending -> done | empty (page has no data) | failed (retried until
+# MAX_ATTEMPTS is reached)
+#
+# content_hash / last_key hold what incremental refreshes need: the hash of
+# the last payload seen and the last date stored for the series.
+
+LEDGER_PATH = "scrape_ledger.sqlite"
+MAX_ATTEMPTS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    ticker      TEXT NOT NULL,
+    category    TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    last_error  TEXT,
+    bytes       INTEGER,
+    duration    REAL,
+    updated_at  REAL,
+    content_hash TEXT,
+    last_key    TEXT,
+    PRIMARY KEY (ticker, category)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (category, status);
+"""
+
+
+class JobLedger:
+    def __init__(self, path=LEDGER_PATH, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        # Shared by browser-pool threads; every statement goes through _lock
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False,
+                                    isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        for column in ("content_hash", "last_key"):
+            if column not in columns:
+                # Ledgers created before incremental refresh existed
+                self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+        self._lock = threading.Lock()
+
+    def seed(self, tickers, categories, output_path=None):
+        # Register new jobs. On the first run `output_path(ticker, category)`
+        # lets files from earlier runs be adopted as done; jobs already in the
+        # ledger are never looked up on disk again.
+        with self._lock:
+            known = set(self.conn.execute("SELECT ticker, category FROM jobs"))
+            rows = []
+            for ticker in tickers:
+                for category in categories:
+                    if (ticker, category) in known:
+                        continue
+                    status, size = "pending", None
+                    if output_path is not None:
+                        path = output_path(ticker, category)
+                        if os.path.exists(path):
+                            status, size = "done", os.path.getsize(path)
+                    rows.append((ticker, category, status, size, time.time()))
+            self.conn.executemany(
+                "INSERT INTO jobs (ticker, category, status, bytes, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)", rows)
+        if rows:
+            print(f"📒 Ledger: registered {len(rows)} new jobs")
+        return len(rows)
+
+    def pending(self, categories):
+        marks = ",".join("?" * len(categories))
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT ticker, category FROM jobs WHERE category IN ({marks})"
+                " AND (status = 'pending' OR (status = 'failed' AND attempts < ?))"
+                " ORDER BY rowid",
+                (*categories, self.max_attempts)).fetchall()
+
+    def requeue(self, categories, older_than=0):
+        # Put finished jobs back in the queue for a refresh run. Jobs touched
+        # less than `older_than` seconds ago are left alone so an interrupted
+        # refresh resumes where it stopped.
+        marks = ",".join("?" * len(categories))
+        with self._lock:
+            cursor = self.conn.execute(
+                f"UPDATE jobs SET status = 'pending', attempts = 0"
+                f" WHERE category IN ({marks}) AND status IN ('done', 'empty')"
+                " AND updated_at < ?",
+                (*categories, time.time() - older_than))
+        print(f"📒 Ledger: {cursor.rowcount} jobs queued for refresh")
+        return cursor.rowcount
+
+    def get_state(self, ticker, category):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT content_hash, last_key FROM jobs WHERE ticker = ? AND category = ?",
+                (ticker, category)).fetchone()
+        return row if row else (None, None)
+
+    def set_state(self, ticker, category, content_hash, last_key):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE jobs SET content_hash = ?, last_key = ? WHERE ticker = ? AND category = ?",
+                (content_hash, last_key, ticker, category))
+
+    def _finish(self, ticker, category, status, error=None, size=None, duration=None):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, last_error = ?,"
+                " bytes = ?, duration = ?, updated_at = ?"
+                " WHERE ticker = ? AND category = ?",
+                (status, error, size, duration, time.time(), ticker, category))
+
+    def mark_done(self, ticker, category, size, duration=None):
+        self._finish(ticker, category, "done", size=size, duration=duration)
+
+    def mark_empty(self, ticker, category, reason, duration=None):
+        self._finish(ticker, category, "empty", error=reason, duration=duration)
+
+    def mark_failed(self, ticker, category, error, duration=None):
+        self._finish(ticker, category, "failed", error=str(error)[:500],
+                     duration=duration)
+
+    def summary(self, categories):
+        marks = ",".join("?" * len(categories))
+        with self._lock:
+            counts = self.conn.execute(
+                f"SELECT status, COUNT(*) FROM jobs WHERE category IN ({marks})"
+                " GROUP BY status", tuple(categories)).fetchall()
+        return "📒 Ledger: " + " | ".join(f"{s} {n}" for s, n in sorted(counts))
+
+    def close(self):
+        self.conn.close()
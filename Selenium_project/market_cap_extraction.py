@@ -1,89 +1,50 @@
-import os
-import time
-import json
-import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
+from readiness import ReadinessLog
+from direct_fetch import make_session
+from job_ledger import JobLedger
+from raw_store import RawStore
+from scraper_core import EXTRACTORS, get_ticker_list, run_jobs
+from telemetry import Telemetry
 
-# === SETUP OPTIONS ===
-options = uc.ChromeOptions()
-options.add_argument('--no-sandbox')
-options.add_argument('--disable-blink-features=AutomationControlled')
-options.add_argument("--window-size=1280,800")
-options.add_argument('--headless=new')
+# "http" reads chartData straight from the page HTML and only starts Chrome
+# when that fails; "browser" always renders the page.
+FETCH_MODE = "http"
 
-# === CREATE OUTPUT FOLDER ===
-output_dir = "market_cap"
-os.makedirs(output_dir, exist_ok=True)
+# "files" writes one JSON file per ticker; "archive" stores compressed,
+# deduplicated payloads in raw_store.sqlite (see raw_store.py)
+STORAGE = "files"
 
-# === FUNCTION TO LOAD TICKERS ===
+CATEGORIES = ["market_cap"]
 
-
-def get_ticker_list():
-    path = os.path.join(os.path.dirname(__file__), 'unique_tickers.txt')
-    try:
-        with open(path, 'r') as f:
-            return [line.strip() for line in f if line.strip()]
-    except FileNotFoundError:
-        print("Ticker list file not found!")
-        return []
-
-
-# === LOAD TICKERS AND FILTER ===
+# === LOAD TICKERS ===
 tickers = get_ticker_list()
 if not tickers:
     print("No tickers found. Exiting.")
     exit()
 
-# Filter to start from 'HSPO'
-if 'UDMY' not in tickers:
-    print("UDMY not found in the ticker list. Exiting.")
-    exit()
-
-# Skip all tickers before 'HSPO'
-start_index = tickers.index('UDMY')
-tickers = tickers[start_index:]
-
-# Filter out tickers whose files already exist
-tickers = [ticker for ticker in tickers if not os.path.exists(
-    os.path.join(output_dir, f"{ticker}_market_cap.json"))]
-if not tickers:
+# Resume from the job ledger: only pending or retryable failed tickers
+ledger = JobLedger()
+ledger.seed(tickers, CATEGORIES, output_path=lambda ticker, category:
+            EXTRACTORS[category].output_path(ticker))
+jobs = ledger.pending(CATEGORIES)
+if not jobs:
     print("All target tickers already processed. Nothing to do.")
     exit()
 
-# === START SELENIUM DRIVER ===
-driver = uc.Chrome(options=options)
-
-# === MARKET CAP URL ===
-base_url = "https://www.macrotrends.net/assets/php/market_cap.php?t={}"
-
-# === LOOP THROUGH TICKERS ===
-for ticker in tickers:
-    print(f"\n➡️ Processing market cap for ticker: {ticker}")
-    try:
-        url = base_url.format(ticker.upper())
-        print(f"🌐 Loading URL: {url}")
-        driver.get(url)
-        time.sleep(3)  # Wait for JavaScript data to load
-
-        try:
-            data_json = driver.execute_script(
-                "return JSON.stringify(window.chartData);")
-            if data_json:
-                output_path = os.path.join(
-                    output_dir, f"{ticker}_market_cap.json")
-                with open(output_path, "w", encoding="utf-8") as f:
-                    f.write(data_json)
-                print(f"💾 Saved market cap data to {output_path}")
-            else:
-                print(f"⚠️ No market cap data found for {ticker}")
-        except WebDriverException as e:
-            print(f"❌ JS extraction failed for {ticker}: {e}")
-
-    except Exception as e:
-        print(f"❌ Failed to fetch market cap for {ticker}: {e}")
-
-# === CLOSE BROWSER ===
-driver.quit()
+# === FETCH ===
+timings = ReadinessLog()
+session = make_session()
+store = RawStore() if STORAGE == "archive" else None
+telemetry = Telemetry("market_cap")
+
+run_jobs(jobs, ledger, session=session, store=store, timings=timings,
+         fetch_mode=FETCH_MODE, telemetry=telemetry)
+
+# === CLEAN UP ===
+session.close()
+if store is not None:
+    store.close()
+telemetry.close()
+print(timings.summary())
+print(telemetry.summary())
+print(ledger.summary(CATEGORIES))
+ledger.close()
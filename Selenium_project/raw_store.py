@@ -0,0 +1,168 @@
+import glob
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import date
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# === RAW PAYLOAD ARCHIVE ===
+# Scraped JSON payloads go into one SQLite file instead of one small file per
+# ticker and category. Payloads are compressed (zstd when installed, gzip
+# otherwise) and stored once per distinct content hash; the payloads table
+# maps (ticker, category, fetch_date) to a blob.
+
+RAW_STORE_PATH = "raw_store.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash   TEXT PRIMARY KEY,
+    codec  TEXT NOT NULL,
+    size   INTEGER NOT NULL,
+    data   BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS payloads (
+    ticker      TEXT NOT NULL,
+    category    TEXT NOT NULL,
+    fetch_date  TEXT NOT NULL,
+    hash        TEXT NOT NULL REFERENCES blobs (hash),
+    PRIMARY KEY (ticker, category, fetch_date)
+);
+CREATE INDEX IF NOT EXISTS payloads_category ON payloads (category, ticker);
+"""
+
+
+def _compress(raw):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(raw)
+    return "gzip", gzip.compress(raw, compresslevel=6)
+
+
+def _decompress(codec, data):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this archive")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class RawStore:
+    def __init__(self, path=RAW_STORE_PATH, keep_history=False):
+        # keep_history=False keeps only the latest fetch per (ticker, category)
+        self.path = path
+        self.keep_history = keep_history
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    # === WRITE ===
+
+    def put(self, ticker, category, text, fetch_date=None):
+        raw = text.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        fetch_date = fetch_date or date.today().isoformat()
+        with self._lock, self.conn:
+            known = self.conn.execute(
+                "SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            if not known:
+                codec, data = _compress(raw)
+                self.conn.execute(
+                    "INSERT INTO blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)",
+                    (digest, codec, len(raw), data))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO payloads (ticker, category, fetch_date, hash)"
+                " VALUES (?, ?, ?, ?)", (ticker, category, fetch_date, digest))
+            if not self.keep_history:
+                older = self.conn.execute(
+                    "SELECT hash FROM payloads WHERE ticker = ? AND category = ? AND fetch_date < ?",
+                    (ticker, category, fetch_date)).fetchall()
+                self.conn.execute(
+                    "DELETE FROM payloads WHERE ticker = ? AND category = ? AND fetch_date < ?",
+                    (ticker, category, fetch_date))
+                # Drop blobs nothing points at any more
+                for (old,) in set(older):
+                    self.conn.execute(
+                        "DELETE FROM blobs WHERE hash = ? AND NOT EXISTS"
+                        " (SELECT 1 FROM payloads WHERE hash = ?)", (old, old))
+        return digest
+
+    def import_directory(self, directory, category, suffix=".json", fetch_date=None):
+        # One-off migration of an existing {ticker}{suffix} folder
+        count = 0
+        for path in glob.glob(os.path.join(directory, f"*{suffix}")):
+            ticker = os.path.basename(path)[:-len(suffix)]
+            with open(path, "r", encoding="utf-8") as f:
+                self.put(ticker, category, f.read(), fetch_date)
+            count += 1
+        print(f"📦 Imported {count} {category} payloads from {directory}")
+        return count
+
+    # === READ ===
+
+    def tickers(self, category):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT ticker FROM payloads WHERE category = ? ORDER BY ticker",
+                (category,)).fetchall()
+        return [row[0] for row in rows]
+
+    def get(self, ticker, category, fetch_date=None):
+        # Latest payload text, or the one fetched on `fetch_date`
+        query = ("SELECT b.codec, b.data FROM payloads p JOIN blobs b ON b.hash = p.hash"
+                 " WHERE p.ticker = ? AND p.category = ?")
+        args = [ticker, category]
+        if fetch_date:
+            query += " AND p.fetch_date = ?"
+            args.append(fetch_date)
+        query += " ORDER BY p.fetch_date DESC LIMIT 1"
+        with self._lock:
+            row = self.conn.execute(query, args).fetchone()
+        if row is None:
+            return None
+        return _decompress(row[0], row[1]).decode("utf-8")
+
+    def get_json(self, ticker, category, fetch_date=None):
+        text = self.get(ticker, category, fetch_date)
+        return None if text is None else json.loads(text)
+
+    def iter_json(self, category):
+        # (ticker, decoded payload) for the latest fetch of every ticker; the
+        # drop-in replacement for glob + json.load in the ETL scripts.
+        cursor = self.conn.execute(
+            "SELECT p.ticker, b.codec, b.data FROM payloads p"
+            " JOIN blobs b ON b.hash = p.hash"
+            " WHERE p.category = ? AND p.fetch_date = ("
+            "   SELECT MAX(fetch_date) FROM payloads q"
+            "   WHERE q.ticker = p.ticker AND q.category = p.category)"
+            " ORDER BY p.ticker", (category,))
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(500)
+            if not rows:
+                break
+            for ticker, codec, data in rows:
+                try:
+                    yield ticker, json.loads(_decompress(codec, data))
+                except json.JSONDecodeError:
+                    print(f"Skipping malformed payload: {ticker}/{category}")
+
+    def close(self):
+        self.conn.close()
+
+
+def save_payload(store, ticker, category, text, output_path):
+    # Scrapers call this instead of open(...).write(): payloads go to the
+    # archive when one is open, otherwise to the usual per-ticker JSON file.
+    if store is not None:
+        store.put(ticker, category, text)
+        return f"{store.path}:{category}/{ticker}"
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return output_path
@@ -0,0 +1,120 @@
+import time
+from contextlib import contextmanager
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# === READINESS WAITS ===
+# Replace fixed sleeps with polls on the page's own JS state. Every wait
+# returns how long the page actually took so slow pages show up in the logs.
+
+READY_TIMEOUT = 10   # seconds before a page is considered broken
+POLL_INTERVAL = 0.1
+
+
+def wait_for_js_json(driver, name, timeout=READY_TIMEOUT, poll=POLL_INTERVAL):
+    # Returns (json_string, seconds); json_string is None on timeout.
+    script = (f"return (typeof {name} !== 'undefined' && {name} !== null)"
+              f" ? JSON.stringify({name}) : null;")
+    start = time.monotonic()
+    try:
+        data = WebDriverWait(driver, timeout, poll_frequency=poll).until(
+            lambda d: d.execute_script(script))
+    except TimeoutException:
+        data = None
+    return data, time.monotonic() - start
+
+
+def js_state(driver, name):
+    # Why a wait_for_js_json came back empty: "absent" when the page loaded
+    # fine and simply has no `name` (nothing to retry), "loading" when the
+    # document never finished parsing, "error" for Chrome's network error
+    # page or an HTTP error other than 404, "present" if it showed up late.
+    script = (
+        "if (location.protocol === 'chrome-error:') return 'error';"
+        "const nav = performance.getEntriesByType('navigation')[0];"
+        "const status = nav && nav.responseStatus;"
+        "if (status && status >= 400 && status !== 404) return 'error';"
+        "if (document.readyState === 'loading') return 'loading';"
+        f"return (typeof {name} === 'undefined' || {name} === null) ? 'absent' : 'present';")
+    try:
+        return driver.execute_script(script)
+    except Exception:
+        return "error"
+
+
+def wait_for_dom(driver, timeout=READY_TIMEOUT, poll=POLL_INTERVAL):
+    start = time.monotonic()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=poll).until(
+            lambda d: d.execute_script("return document.readyState") != "loading")
+    except TimeoutException:
+        pass
+    return time.monotonic() - start
+
+
+def wait_for_reload(driver, action, timeout=2, poll=POLL_INTERVAL):
+    # Run `action` and wait until it replaces the current document. A marker
+    # on window disappears on navigation; returns seconds, or None if the
+    # page never reloaded within `timeout`.
+    driver.execute_script("window.__mtPending = true;")
+    action()
+    start = time.monotonic()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=poll).until(
+            lambda d: d.execute_script(
+                "return typeof window.__mtPending === 'undefined'"
+                " && document.readyState !== 'loading';"))
+    except TimeoutException:
+        return None
+    return time.monotonic() - start
+
+
+# === TIMING LOG ===
+
+
+class ReadinessLog:
+    def __init__(self):
+        self.timings = []
+        self.timeouts = 0
+
+    def record(self, seconds, ready=True):
+        self.timings.append(seconds)
+        if not ready:
+            self.timeouts += 1
+
+    def summary(self):
+        if not self.timings:
+            return "⏱️ No pages timed."
+        ordered = sorted(self.timings)
+        avg = sum(ordered) / len(ordered)
+        median = ordered[len(ordered) // 2]
+        return (f"⏱️ {len(ordered)} pages | avg {avg:.2f}s | median {median:.2f}s"
+                f" | max {ordered[-1]:.2f}s | timeouts {self.timeouts}")
+
+
+# === STEP TIMINGS ===
+# Per-step cost of the UI interactions on a page (navigation, cookie banner,
+# dropdown, extraction...), aggregated over the whole run.
+
+
+class StepTimings:
+    def __init__(self):
+        self.steps = {}
+
+    @contextmanager
+    def step(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.steps.setdefault(name, []).append(time.monotonic() - start)
+
+    def summary(self):
+        if not self.steps:
+            return "⏱️ No steps timed."
+        lines = ["⏱️ Step timings:"]
+        for name, values in self.steps.items():
+            total = sum(values)
+            lines.append(f"   {name:<12} {len(values):>6}x | avg {total / len(values):.2f}s"
+                         f" | total {total:.0f}s")
+        return "\n".join(lines)
@@ -0,0 +1,382 @@
+import os
+import time
+import weakref
+import undetected_chromedriver as uc
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import InvalidSessionIdException, NoSuchWindowException
+
+from direct_fetch import extract_js_array, fetch_embedded_json, to_json_text
+from incremental import merge_price_history
+from raw_store import save_payload
+from readiness import StepTimings, js_state, wait_for_dom, wait_for_js_json, wait_for_reload
+from telemetry import begin_fetch, end_fetch, phase
+
+# === SHARED SCRAPER CORE ===
+# Chrome setup, the ticker list, the per-category extractors and the
+# fetch -> extract -> save loop used by every Macrotrends scraper.
+
+BASE_URL = "https://www.macrotrends.net"
+FINANCIAL_SECTIONS = ["income-statement", "balance-sheet",
+                      "cash-flow-statement", "financial-ratios"]
+
+
+class ExtractionError(Exception):
+    pass
+
+
+# Per-step UI timings of the statement pages, printed by the scrapers
+STEP_TIMINGS = StepTimings()
+
+
+# === TICKERS ===
+
+
+def get_ticker_list(path=None):
+    path = path or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'unique_tickers.txt')
+    try:
+        with open(path, 'r') as f:
+            return [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        print("❌ Ticker list file not found!")
+        return []
+
+
+# === DRIVER FACTORY ===
+# Heavy resources are blocked through CDP instead of the uBlock .crx, so no
+# extension path is needed and every page load skips images, fonts, CSS and
+# ad/analytics traffic.
+
+BLOCKED_RESOURCES = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*.mp4", "*.webm",
+]
+BLOCKED_CSS = ["*.css"]
+AD_DOMAINS = [
+    "*doubleclick.net*", "*googlesyndication.com*", "*googletagservices.com*",
+    "*googletagmanager.com*", "*google-analytics.com*", "*adservice.google.*",
+    "*amazon-adsystem.com*", "*adnxs.com*", "*taboola.com*", "*outbrain.com*",
+    "*criteo.com*", "*criteo.net*", "*pubmatic.com*", "*rubiconproject.com*",
+    "*openx.net*", "*casalemedia.com*", "*moatads.com*", "*quantserve.com*",
+    "*scorecardresearch.com*", "*adsafeprotected.com*", "*3lift.com*",
+]
+
+
+def build_options(headless=True):
+    # uc.Chrome refuses to reuse a ChromeOptions object, so every driver
+    # gets a fresh one.
+    options = uc.ChromeOptions()
+    if headless:
+        options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_argument("--window-size=1280,800")
+    options.add_argument('--host-resolver-rules=MAP localhost 127.0.0.1')
+    # Return from driver.get() at DOMContentLoaded; readiness is polled
+    options.page_load_strategy = 'eager'
+    return options
+
+
+def make_driver(headless=True, block_resources=True, block_css=True):
+    # block_css=False for pages that are driven through the UI (the
+    # financials select2 dropdown needs its stylesheet to be clickable).
+    driver = uc.Chrome(options=build_options(headless))
+    if block_resources:
+        patterns = BLOCKED_RESOURCES + AD_DOMAINS
+        if block_css:
+            patterns = patterns + BLOCKED_CSS
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    return driver
+
+
+# === EXTRACTORS ===
+# One extractor per category: where the data lives, how to pull it out of
+# the page and how to store it.
+
+
+class Extractor:
+    def __init__(self, category, url_template, variable, output_template):
+        self.category = category
+        self.url_template = url_template
+        self.variable = variable
+        self.output_template = output_template
+
+    def url(self, ticker):
+        return self.url_template.format(T=ticker.upper(), t=ticker, lower=ticker.lower())
+
+    def output_path(self, ticker, base_dir="."):
+        return os.path.join(base_dir, self.output_template.format(t=ticker))
+
+    def fetch_http(self, session, ticker):
+        return fetch_embedded_json(session, self.url(ticker), self.variable)
+
+    def fetch_in_page(self, driver, ticker):
+        # Same-origin fetch() from the page already open in `driver`: reuses
+        # its cookies and session without another navigation. None when the
+        # request fails or the page carries no data.
+        driver.set_script_timeout(30)
+        with phase("navigate"):
+            html = driver.execute_async_script(
+                "const done = arguments[arguments.length - 1];"
+                "fetch(arguments[0], {credentials: 'include'})"
+                ".then(r => r.ok ? r.text() : null).then(done).catch(() => done(null));",
+                self.url(ticker))
+        if not html:
+            return None
+        with phase("extract"):
+            data = extract_js_array(html, self.variable)
+        return to_json_text(data) if data else None
+
+    def fetch_browser(self, driver, ticker, timings=None):
+        with phase("navigate"):
+            driver.get(self.url(ticker))
+        with phase("extract"):
+            data_json, waited = wait_for_js_json(driver, f"window.{self.variable}")
+        if timings is not None:
+            timings.record(waited, ready=data_json is not None)
+        print(f"⏱️ Ready in {waited:.2f}s")
+        if data_json is None:
+            self._check_absent(driver, f"window.{self.variable}")
+        return data_json
+
+    def _check_absent(self, driver, name):
+        # None is only a final "empty" when the page really has no data;
+        # timeouts and error pages raise so the job is marked failed and
+        # retried
+        state = js_state(driver, name)
+        if state != "absent":
+            raise ExtractionError(f"{name} not available ({state})")
+
+    def save(self, ticker, text, store=None, ledger=None, base_dir="."):
+        path = self.output_path(ticker, base_dir)
+        if store is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        saved_to = save_payload(store, ticker, self.category, text, path)
+        print(f"💾 Saved {self.category} data to {saved_to}")
+        return saved_to
+
+
+class PriceHistoryExtractor(Extractor):
+    # With incremental=True only new rows are appended to the stored file
+    # (see incremental.py); the archive deduplicates payloads on its own.
+    incremental = False
+
+    def save(self, ticker, text, store=None, ledger=None, base_dir="."):
+        if not self.incremental or store is not None or ledger is None:
+            return super().save(ticker, text, store, ledger, base_dir)
+
+        path = self.output_path(ticker, base_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stored_hash, last_date = ledger.get_state(ticker, self.category)
+        status, content_hash, last_key, added = merge_price_history(
+            path, text, stored_hash, last_date)
+        ledger.set_state(ticker, self.category, content_hash, last_key)
+        if status == "appended":
+            print(f"➕ Appended {added} new rows to {path}")
+        elif status == "unchanged":
+            print(f"⏩ {ticker} unchanged since last fetch")
+        else:
+            print(f"💾 Saved {self.category} data to {path}")
+        return path
+
+
+# Drivers that already went through the cookie banner; the consent cookie
+# lives in the browser profile, so later pages never show it again.
+_consented_drivers = weakref.WeakSet()
+
+
+class FinancialsExtractor(Extractor):
+    # Statement pages need the cookie banner and ad popups handled. With
+    # use_dropdown=True the "Format: Quarterly" select2 dropdown is clicked as
+    # well; otherwise the ?freq=Q in the URL is trusted to serve quarterly data.
+    use_dropdown = True
+
+    def _accept_cookies(self, driver):
+        if driver in _consented_drivers:
+            return
+        try:
+            accept_btn = WebDriverWait(driver, 15).until(EC.element_to_be_clickable(
+                (By.XPATH, "//button[contains(text(),'Tout accepter')]")))
+            accept_btn.click()
+            print("✅ Cookie accepted.")
+        except Exception:
+            print("⚠️ Cookie already accepted or not shown.")
+        _consented_drivers.add(driver)
+
+    def _close_ads(self, driver):
+        try:
+            close_ad_btns = driver.find_elements(
+                By.XPATH, "//div[contains(@class, 'ns-fnt3e-e-17')]//span[text()='Close']")
+            for btn in close_ad_btns:
+                driver.execute_script("arguments[0].click();", btn)
+            if close_ad_btns:
+                print(f"✅ Closed {len(close_ad_btns)} ad(s).")
+        except Exception:
+            pass
+
+    def _select_quarterly(self, driver):
+        wait = WebDriverWait(driver, 15)
+        try:
+            dropdown = wait.until(EC.element_to_be_clickable(
+                (By.CLASS_NAME, "select2-selection")))
+            dropdown.click()
+            quarterly = wait.until(EC.element_to_be_clickable(
+                (By.XPATH, "//li[contains(text(), 'Format: Quarterly')]")))
+            # Wait for the reload the selection triggers (at most 2s)
+            wait_for_reload(driver, quarterly.click)
+            print("✅ 'Format: Quarterly' selected.")
+        except Exception as e:
+            raise ExtractionError(f"dropdown: {e}")
+
+    def fetch_in_page(self, driver, ticker):
+        with STEP_TIMINGS.step("in-page"):
+            return super().fetch_in_page(driver, ticker)
+
+    def fetch_browser(self, driver, ticker, timings=None):
+        started = time.monotonic()
+        with STEP_TIMINGS.step("navigate"), phase("navigate"):
+            driver.get(self.url(ticker))
+            wait_for_dom(driver)
+
+        page_source = driver.page_source
+        if "Cette page ne fonctionne pas" in page_source or "Oops! We can't find that page." in page_source:
+            print("🚫 Skipping — broken or missing page.")
+            return None
+
+        with STEP_TIMINGS.step("cookie"):
+            self._accept_cookies(driver)
+        with STEP_TIMINGS.step("ads"):
+            self._close_ads(driver)
+        if self.use_dropdown:
+            with STEP_TIMINGS.step("dropdown"):
+                self._select_quarterly(driver)
+
+        with STEP_TIMINGS.step("extract"), phase("extract"):
+            json_data, _ = wait_for_js_json(driver, self.variable)
+        if timings is not None:
+            timings.record(time.monotonic() - started, ready=json_data is not None)
+        if json_data is None:
+            self._check_absent(driver, self.variable)
+        if json_data == "undefined":
+            return None
+        return json_data
+
+
+EXTRACTORS = {
+    "stock_data": PriceHistoryExtractor(
+        "stock_data", BASE_URL + "/assets/php/stock_price_history.php?t={T}",
+        "dataDaily", "stock_data/{t}_stock_data.json"),
+    "stock_splits": Extractor(
+        "stock_splits", BASE_URL + "/assets/php/stock_splits.php?t={T}",
+        "dataDaily", "stock_splits/{t}_stock_splits.json"),
+    "market_cap": Extractor(
+        "market_cap", BASE_URL + "/assets/php/market_cap.php?t={T}",
+        "chartData", "market_cap/{t}_market_cap.json"),
+}
+for _section in FINANCIAL_SECTIONS:
+    EXTRACTORS[_section] = FinancialsExtractor(
+        _section, BASE_URL + "/stocks/charts/{t}/{lower}/" + _section + "?freq=Q",
+        "originalData", _section + "/{t}.json")
+
+
+# === FETCH / EXTRACT / SAVE LOOP ===
+
+
+def fetch_job(ticker, category, ledger, driver=None, session=None, store=None,
+              timings=None, fetch_mode="http", base_dir=".", telemetry=None):
+    # Runs one (ticker, category) job and records the outcome in the ledger
+    # (and in `telemetry` when given). `driver` may be a zero-argument
+    # callable so Chrome is only started when the direct HTTP path fails.
+    # fetch_mode is "http", "browser", or "page" (fetch() from the page
+    # already open in the driver, then navigate).
+    extractor = EXTRACTORS[category]
+    started = time.monotonic()
+    outcome, size = "failed", None
+    begin_fetch()
+    try:
+        data_json = None
+        if fetch_mode == "http" and session is not None:
+            data_json = extractor.fetch_http(session, ticker)
+            if data_json is None:
+                print("🧭 Falling back to Chrome")
+        browser = None
+        if fetch_mode == "page":
+            browser = driver() if callable(driver) else driver
+            data_json = extractor.fetch_in_page(browser, ticker)
+            if data_json is None:
+                print("🧭 In-page fetch failed, navigating")
+        if data_json is None:
+            browser = browser or (driver() if callable(driver) else driver)
+            data_json = extractor.fetch_browser(browser, ticker, timings)
+
+        if data_json:
+            extractor.save(ticker, data_json, store=store, ledger=ledger, base_dir=base_dir)
+            outcome, size = "done", len(data_json)
+            ledger.mark_done(ticker, category, size, time.monotonic() - started)
+        else:
+            # The page loaded and has no data; failures raised above
+            print(f"⚠️ No {category} data found for {ticker}")
+            outcome = "empty"
+            ledger.mark_empty(ticker, category, f"no {extractor.variable}",
+                              time.monotonic() - started)
+    except (InvalidSessionIdException, NoSuchWindowException) as e:
+        # Dead browser: let the caller replace the driver
+        ledger.mark_failed(ticker, category, e, time.monotonic() - started)
+        raise
+    except Exception as e:
+        print(f"❌ Failed to fetch {category} for {ticker}: {e}")
+        ledger.mark_failed(ticker, category, e, time.monotonic() - started)
+    finally:
+        phases = end_fetch()
+        if telemetry is not None:
+            telemetry.record(ticker, category, outcome, time.monotonic() - started,
+                             size, phases)
+
+
+def fetch_statements(ticker, sections, ledger, driver, store=None, timings=None,
+                     base_dir=".", telemetry=None, pace=None):
+    # All statement sections of one ticker for the price of one navigation:
+    # the first section is loaded in Chrome (cookie banner, ads), the others
+    # are fetched from inside that page and parsed without rendering.
+    # `pace` (e.g. PolitenessBudget.acquire) is called before every request
+    # after the first, which the caller has already paid for.
+    for i, section in enumerate(sections):
+        if i and pace is not None:
+            pace()
+        print(f"\n📄 Fetching section: {section} for {ticker}")
+        fetch_job(ticker, section, ledger, driver=driver, store=store, timings=timings,
+                  fetch_mode="browser" if i == 0 else "page", base_dir=base_dir,
+                  telemetry=telemetry)
+
+
+def run_jobs(jobs, ledger, session=None, store=None, timings=None,
+             fetch_mode="http", driver_factory=make_driver, base_dir=".", telemetry=None):
+    # Serial loop over (ticker, category) jobs with one lazily started Chrome
+    driver = None
+
+    def get_driver():
+        nonlocal driver
+        if driver is None:
+            driver = driver_factory()
+        return driver
+
+    try:
+        for ticker, category in jobs:
+            print(f"\n➡️ Processing {category} for ticker: {ticker}")
+            try:
+                fetch_job(ticker, category, ledger, driver=get_driver, session=session,
+                          store=store, timings=timings, fetch_mode=fetch_mode,
+                          base_dir=base_dir, telemetry=telemetry)
+            except (InvalidSessionIdException, NoSuchWindowException) as e:
+                print(f"♻️ Browser session lost ({e}), restarting Chrome")
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+                driver = None
+    finally:
+        if driver is not None:
+            driver.quit()
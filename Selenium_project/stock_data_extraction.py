@@ -1,40 +1,28 @@
-import os
-import time
-import json
-import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
-
-# === SETUP OPTIONS ===
-options = uc.ChromeOptions()
-# Use headless mode for background execution
-options.add_argument('--headless=new')
-options.add_argument('--no-sandbox')
-options.add_argument('--disable-blink-features=AutomationControlled')
-options.add_argument("--window-size=1280,800")
-
-# === CREATE OUTPUT FOLDERS ===
-output_dirs = {
-    "stock_data": "stock_data",
-    "stock_splits": "stock_splits",
-}
-for folder in output_dirs.values():
-    os.makedirs(folder, exist_ok=True)
-
-# === FUNCTION TO LOAD TICKERS ===
-
-
-def get_ticker_list():
-    path = os.path.join(os.path.dirname(__file__), 'unique_tickers.txt')
-    try:
-        with open(path, 'r') as f:
-            return [line.strip() for line in f if line.strip()]
-    except FileNotFoundError:
-        print("Ticker list file not found!")
-        return []
-
+from readiness import ReadinessLog
+from direct_fetch import make_session
+from job_ledger import JobLedger
+from raw_store import RawStore
+from scraper_core import EXTRACTORS, get_ticker_list, run_jobs
+from telemetry import Telemetry
+
+# "http" reads dataDaily straight from the page HTML and only starts Chrome
+# when that fails; "browser" always renders the page.
+FETCH_MODE = "http"
+
+# "files" writes one JSON file per ticker; "archive" stores compressed,
+# deduplicated payloads in raw_store.sqlite (see raw_store.py)
+STORAGE = "files"
+
+# Daily refresh: tickers finished more than REFRESH_AGE seconds ago are
+# fetched again, and with INCREMENTAL only new price rows are appended to the
+# stored history (unchanged payloads are skipped). The archive deduplicates
+# unchanged payloads itself, so INCREMENTAL only applies to file storage.
+REFRESH = True
+REFRESH_AGE = 20 * 3600
+INCREMENTAL = True
+
+CATEGORIES = ["stock_data", "stock_splits"]
+EXTRACTORS["stock_data"].incremental = INCREMENTAL
 
 # === LOAD TICKERS ===
 tickers = get_ticker_list()
@@ -42,41 +30,30 @@ if not tickers:
     print("No tickers found. Exiting.")
     exit()
 
-# === START SELENIUM DRIVER ===
-driver = uc.Chrome(options=options)
-
-# === URL TYPES TO FETCH ===
-url_map = {
-    "stock_data": "https://www.macrotrends.net/assets/php/stock_price_history.php?t={}",
-    "stock_splits": "https://www.macrotrends.net/assets/php/stock_splits.php?t={}",
-}
-
-# === LOOP THROUGH TICKERS ===
-for ticker in tickers[5666:]:
-    print(f"\n➡️ Processing ticker: {ticker}")
-    for category, base_url in url_map.items():
-        try:
-            url = base_url.format(ticker.upper())
-            print(f"🌐 Loading URL for {category}: {url}")
-            driver.get(url)
-            time.sleep(3)  # Wait for JavaScript data to load
-
-            try:
-                data_json = driver.execute_script(
-                    "return JSON.stringify(window.dataDaily);")
-                if data_json:
-                    output_path = os.path.join(
-                        output_dirs[category], f"{ticker}_{category}.json")
-                    with open(output_path, "w", encoding="utf-8") as f:
-                        f.write(data_json)
-                    print(f"💾 Saved {category} data to {output_path}")
-                else:
-                    print(f"⚠️ No {category} data found for {ticker}")
-            except WebDriverException as e:
-                print(f"❌ JS extraction failed for {category} - {ticker}: {e}")
-
-        except Exception as e:
-            print(f"❌ Failed to fetch {category} for {ticker}: {e}")
-
-# === CLOSE BROWSER ===
-driver.quit()
+# === LOAD OUTSTANDING JOBS FROM THE LEDGER ===
+ledger = JobLedger()
+ledger.seed(tickers, CATEGORIES, output_path=lambda ticker, category:
+            EXTRACTORS[category].output_path(ticker))
+if REFRESH:
+    ledger.requeue(CATEGORIES, older_than=REFRESH_AGE)
+jobs = ledger.pending(CATEGORIES)
+print(f"📋 {len(jobs)} pending jobs")
+
+# === FETCH ===
+timings = ReadinessLog()
+session = make_session()
+store = RawStore() if STORAGE == "archive" else None
+telemetry = Telemetry("stock_data")
+
+run_jobs(jobs, ledger, session=session, store=store, timings=timings,
+         fetch_mode=FETCH_MODE, telemetry=telemetry)
+
+# === CLEAN UP ===
+session.close()
+if store is not None:
+    store.close()
+telemetry.close()
+print(timings.summary())
+print(telemetry.summary())
+print(ledger.summary(CATEGORIES))
+ledger.close()
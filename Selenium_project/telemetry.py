@@ -0,0 +1,159 @@
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# === SCRAPER TELEMETRY ===
+# One record per fetch (ticker, category, navigation time, extraction time,
+# payload bytes, outcome). Records are appended to metrics/<name>_fetches.csv
+# and a rolling summary (p50/p95/p99 latency, error rate, tickers/min) over
+# the last WINDOW fetches is rewritten to metrics/<name>_summary.json every
+# FLUSH_EVERY seconds. Rising p95 or error rate is the first sign of
+# Macrotrends throttling us.
+
+METRICS_DIR = "metrics"
+WINDOW = 500          # fetches in the rolling window
+FLUSH_EVERY = 30.0    # seconds between metrics file writes
+
+FIELDS = ["time", "ticker", "category", "outcome", "navigate", "extract",
+          "total", "bytes", "retries"]
+OUTCOMES = ["done", "empty", "failed"]
+
+
+# === PHASE TIMERS ===
+# Extractors time their own navigation and extraction with `phase(...)`;
+# the times land in the record of the fetch running on the same thread.
+
+_current = threading.local()
+
+
+def begin_fetch():
+    _current.phases = {}
+    return _current.phases
+
+
+def end_fetch():
+    phases = getattr(_current, "phases", None) or {}
+    _current.phases = None
+    return phases
+
+
+@contextmanager
+def phase(name):
+    phases = getattr(_current, "phases", None)
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + time.monotonic() - start
+
+
+def percentile(ordered, q):
+    # Nearest-rank percentile of an already sorted list
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+# === AGGREGATION ===
+
+
+class Telemetry:
+    def __init__(self, name, directory=METRICS_DIR, window=WINDOW, flush_every=FLUSH_EVERY):
+        os.makedirs(directory, exist_ok=True)
+        self.csv_path = os.path.join(directory, f"{name}_fetches.csv")
+        self.json_path = os.path.join(directory, f"{name}_summary.json")
+        self.name = name
+        self.flush_every = flush_every
+        self.recent = deque(maxlen=window)
+        self.counts = dict.fromkeys(OUTCOMES, 0)
+        self.tickers = set()
+        self.start = time.time()
+        self.last_flush = time.monotonic()
+        self._rows = []
+        self._lock = threading.Lock()
+        # Held for a whole flush so two threads never write the .tmp file
+        # (or append their rows) at the same time
+        self._flush_lock = threading.Lock()
+        if not os.path.exists(self.csv_path):
+            with open(self.csv_path, "w", newline="") as f:
+                csv.writer(f).writerow(FIELDS)
+
+    def record(self, ticker, category, outcome, total, size=None, phases=None, retries=0):
+        phases = phases or {}
+        row = {
+            "time": round(time.time(), 3), "ticker": ticker, "category": category,
+            "outcome": outcome, "navigate": round(phases.get("navigate", 0.0), 4),
+            "extract": round(phases.get("extract", 0.0), 4), "total": round(total, 4),
+            "bytes": size or 0, "retries": retries,
+        }
+        with self._lock:
+            self.recent.append(row)
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+            self.tickers.add(ticker)
+            self._rows.append(row)
+            due = time.monotonic() - self.last_flush >= self.flush_every
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            recent = list(self.recent)
+            counts = dict(self.counts)
+            tickers = len(self.tickers)
+        elapsed = time.time() - self.start
+        fetches = sum(counts.values())
+        summary = {
+            "name": self.name,
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "elapsed_s": round(elapsed, 1),
+            "fetches": fetches,
+            "outcomes": counts,
+            "tickers_per_min": round(tickers / elapsed * 60, 2) if elapsed else 0.0,
+            "window": len(recent),
+        }
+        if recent:
+            span = recent[-1]["time"] - recent[0]["time"]
+            recent_tickers = len({row["ticker"] for row in recent})
+            failed = sum(row["outcome"] == "failed" for row in recent)
+            summary["window_error_rate"] = round(failed / len(recent), 4)
+            summary["window_tickers_per_min"] = (
+                round(recent_tickers / span * 60, 2) if span > 0 else None)
+            summary["window_retries"] = sum(row["retries"] for row in recent)
+            for field in ("total", "navigate", "extract"):
+                ordered = sorted(row[field] for row in recent)
+                summary[field] = {f"p{q}": percentile(ordered, q) for q in (50, 95, 99)}
+            summary["bytes_p50"] = percentile(sorted(row["bytes"] for row in recent), 50)
+        return summary
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                self.last_flush = time.monotonic()
+            if rows:
+                with open(self.csv_path, "a", newline="") as f:
+                    csv.DictWriter(f, fieldnames=FIELDS).writerows(rows)
+            # Write-then-rename so a dashboard never reads a half-written file
+            tmp_path = self.json_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(tmp_path, self.json_path)
+
+    def summary(self):
+        snap = self.snapshot()
+        if not snap["fetches"]:
+            return "📈 No fetches recorded."
+        total = snap.get("total", {})
+        return (f"📈 {snap['fetches']} fetches | p50 {total.get('p50', 0):.2f}s"
+                f" | p95 {total.get('p95', 0):.2f}s | p99 {total.get('p99', 0):.2f}s"
+                f" | errors {snap.get('window_error_rate', 0):.1%}"
+                f" | {snap['tickers_per_min']:.1f} tickers/min")
+
+    def close(self):
+        self.flush()